@@ -12,6 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 from channels.auth import AuthMiddlewareStack
 from channels.routing import ProtocolTypeRouter, URLRouter
+import course_service.routing
 import message_service
 import message_service.routing
 
@@ -29,6 +30,7 @@ application = ProtocolTypeRouter({
     "websocket": AuthMiddlewareStack( # Adds authenticated user to scope
         URLRouter(
             message_service.routing.websocket_urlpatterns # Point to your app's WS urls
+            + course_service.routing.websocket_urlpatterns
         )
     ),
 })
\ No newline at end of file
@@ -0,0 +1,201 @@
+"""
+Minimal async counterpart of DRF's APIView for read-only endpoints.
+
+DRF views are sync only, so under Daphne every request to them is handed to
+the thread pool through sync_to_async. The views built on AsyncAPIView run on
+the event loop instead: authentication, permission checks and pagination are
+awaited and the ORM is used through its async API (aget, acount, async for).
+
+They are meant to mirror existing DRF views, reusing their serializers, so
+responses and error bodies have the same shape. Only JSON is rendered.
+"""
+import inspect
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.utils.decorators import classonlymethod
+from django.views import View
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import exceptions, status
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .pagination import LimitOffsetPagination
+from .renderers import dumps
+
+
+class AsyncJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication with the user lookup done through the async ORM."""
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Token contained no recognizable user identification")
+
+        try:
+            user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed("The user's password has been changed.", code="password_changed")
+
+        return user
+
+
+class AsyncLimitOffsetPagination(LimitOffsetPagination):
+    """LimitOffsetPagination with the count and the page fetched through the async ORM."""
+
+    async def apaginate(self, queryset, request):
+        """
+        Returns (objects, envelope) where envelope is None when the request
+        isn't paginated, otherwise the count/next/previous dict the results
+        should be put in.
+        """
+        self.request = request
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return [obj async for obj in queryset], None
+
+        self.count = await queryset.acount()
+        self.offset = self.get_offset(request)
+        if self.count == 0 or self.offset > self.count:
+            objects = []
+        else:
+            objects = [obj async for obj in queryset[self.offset:self.offset + self.limit]]
+        return objects, {'count': self.count, 'next': self.get_next_link(), 'previous': self.get_previous_link()}
+
+
+class AsyncAPIView(View):
+    """
+    Base class for the async read views. Subclasses implement `async def
+    get(self, request, *args, **kwargs)` and return self.respond(data).
+
+    Permission classes are regular DRF permission classes; has_permission()
+    may also be a coroutine.
+    """
+    authentication_classes = [AsyncJWTAuthentication]
+    permission_classes = []
+    http_method_names = ['get', 'head', 'options']
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # Same as APIView: JWT in a header, no session/CSRF involved
+        view.csrf_exempt = True
+        return view
+
+    async def authenticate(self, request):
+        request.auth = None
+        for authenticator in self.authentication_classes:
+            result = await authenticator().aauthenticate(request)
+            if result is not None:
+                request.user, request.auth = result
+                return
+        request.user = AnonymousUser()
+
+    async def check_permissions(self, request):
+        for permission in [permission() for permission in self.permission_classes]:
+            allowed = permission.has_permission(request, self)
+            if inspect.isawaitable(allowed):
+                allowed = await allowed
+            if not allowed:
+                if request.auth is None and not request.user.is_authenticated:
+                    raise exceptions.NotAuthenticated()
+                raise exceptions.PermissionDenied(getattr(permission, 'message', None))
+
+    async def dispatch(self, request, *args, **kwargs):
+        # Where DRF's Request has the query string; the filter backend and
+        # the paginator read it from there
+        request.query_params = request.GET
+        try:
+            await self.authenticate(request)
+            await self.check_permissions(request)
+            return await super().dispatch(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            return self.handle_exception(exc)
+
+    def handle_exception(self, exc):
+        # Mirrors rest_framework.views.exception_handler
+        headers = {}
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            headers['WWW-Authenticate'] = AsyncJWTAuthentication().authenticate_header(self.request)
+        data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+        return self.respond(data, status=exc.status_code, headers=headers)
+
+    def respond(self, data, status=status.HTTP_200_OK, headers=None):
+        return HttpResponse(dumps(data), status=status, headers=headers, content_type='application/json')
+
+    async def filter_queryset(self, request, queryset):
+        """
+        Filters with the FilterSet DjangoFilterBackend builds for the sync
+        views from `filterset_fields`, so the same values are accepted and
+        invalid ones get the same 400. Validating it can query the database
+        (a ModelChoiceFilter looks the object up), so that runs in a thread,
+        and only when one of the filters is in the query string.
+        """
+        backend = DjangoFilterBackend()
+        filterset_class = backend.get_filterset_class(self, queryset)
+        if filterset_class is None or not any(request.GET.get(name) for name in filterset_class.base_filters):
+            return queryset
+        return await sync_to_async(backend.filter_queryset)(request, queryset, self)
+
+
+class AsyncGenericAPIView(AsyncAPIView):
+    """Like DRF's GenericAPIView, set `queryset` or override get_queryset()."""
+    queryset = None
+    serializer_class = None
+
+    def get_queryset(self):
+        assert self.queryset is not None, (
+            "'%s' should either include a `queryset` attribute, "
+            "or override the `get_queryset()` method."
+            % self.__class__.__name__
+        )
+        # A fresh queryset per request, so no results are cached across them
+        return self.queryset.all()
+
+
+class AsyncListAPIView(AsyncGenericAPIView):
+    pagination_class = AsyncLimitOffsetPagination
+    filterset_fields = None
+
+    async def get(self, request, *args, **kwargs):
+        queryset = await self.filter_queryset(request, self.get_queryset())
+        objects, envelope = await self.pagination_class().apaginate(queryset, request)
+        data = self.serializer_class(objects, many=True, context={'request': request}).data
+        if envelope is not None:
+            data = dict(envelope, results=data)
+        return self.respond(data)
+
+
+class AsyncRetrieveAPIView(AsyncGenericAPIView):
+    lookup_field = 'pk'
+
+    async def get(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        try:
+            instance = await queryset.aget(**{self.lookup_field: kwargs[self.lookup_field]})
+        except queryset.model.DoesNotExist:
+            raise exceptions.NotFound('No %s matches the given query.' % queryset.model._meta.object_name)
+        return self.respond(self.serializer_class(instance, context={'request': request}).data)
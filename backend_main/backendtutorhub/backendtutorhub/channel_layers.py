@@ -0,0 +1,140 @@
+"""
+Channel layer that spreads groups and channels over several Redis nodes
+with a consistent hash ring.
+
+channels_redis already shards over multiple hosts, but it places a key by
+splitting a 4096-slot CRC range evenly between the hosts. Adding a third
+host to two moves about half of all groups, and with them the members of
+every chat_<a>_<b> group connected at that moment. ShardedRedisChannelLayer
+keeps channels_redis' storage and protocol and only replaces the placement.
+Each host gets `vnodes` points on a ring keyed by its address, so:
+
+- adding or removing a host moves only the keys between its points and
+  their neighbours, about 1/N of them;
+- the order of the hosts in the settings doesn't matter.
+
+Direct sends to process-specific channels are also fixed: with several hosts,
+channels_redis can write those to a different host than the one the
+receiving process reads from.
+
+Per shard, it counts operations, messages delivered and errors, and keeps
+an up/down gauge (see backendtutorhub.metrics).
+"""
+import bisect
+import hashlib
+import time
+from urllib.parse import urlsplit
+
+from channels_redis.core import RedisChannelLayer
+
+from .metrics import (
+    CHANNEL_LAYER_SHARD_DELIVERIES,
+    CHANNEL_LAYER_SHARD_ERRORS,
+    CHANNEL_LAYER_SHARD_OPERATIONS,
+    CHANNEL_LAYER_SHARD_UP,
+)
+
+
+def _hash(value):
+    return int.from_bytes(hashlib.blake2b(value, digest_size=8).digest(), 'big')
+
+
+class HashRing:
+    """Maps keys to one of `nodes` (names), `vnodes` points per node."""
+
+    def __init__(self, nodes, vnodes=160):
+        points = sorted(
+            (_hash(f'{node}#{replica}'.encode()), index)
+            for index, node in enumerate(nodes)
+            for replica in range(vnodes)
+        )
+        self._hashes = [point for point, _ in points]
+        self._nodes = [index for _, index in points]
+
+    def get(self, key):
+        """Index of the node owning `key` (str or bytes)."""
+        if isinstance(key, str):
+            key = key.encode('utf8')
+        position = bisect.bisect(self._hashes, _hash(key))
+        return self._nodes[position % len(self._nodes)]
+
+
+def shard_name(host):
+    """host:port/db of a channels_redis host, without credentials."""
+    if 'address' in host:
+        parts = urlsplit(host['address'])
+        return f'{parts.hostname}:{parts.port or 6379}{parts.path or ""}'
+    if 'sentinels' in host:
+        return f"sentinel:{host.get('master_name', '')}"
+    return f"{host.get('host', 'localhost')}:{host.get('port', 6379)}"
+
+
+class ShardedRedisChannelLayer(RedisChannelLayer):
+    """
+    RedisChannelLayer with consistent-hash placement and per-shard counters.
+    Takes the same CONFIG, plus `vnodes` (points per host on the ring).
+    """
+
+    def __init__(self, *args, vnodes=160, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.shard_names = [shard_name(host) for host in self.hosts]
+        self.ring = HashRing(self.shard_names, vnodes)
+
+    def consistent_hash(self, value):
+        if self.ring_size == 1:
+            return 0
+        # All process-specific channels of a process share one queue, stored
+        # under the part up to the "!". channels_redis hashes that part in
+        # receive() and group_send() but the full name in send(); hashing
+        # the queue name everywhere keeps send() on the shard receive() reads
+        if isinstance(value, str) and '!' in value:
+            value = self.non_local_name(value)
+        return self.ring.get(value)
+
+    async def _tracked(self, operation, index, call):
+        shard = self.shard_names[index]
+        try:
+            result = await call
+        except Exception:
+            CHANNEL_LAYER_SHARD_ERRORS.labels(shard, operation).inc()
+            CHANNEL_LAYER_SHARD_UP.labels(shard).set(0)
+            raise
+        CHANNEL_LAYER_SHARD_OPERATIONS.labels(shard, operation).inc()
+        CHANNEL_LAYER_SHARD_UP.labels(shard).set(1)
+        return result
+
+    async def send(self, channel, message):
+        # Only process-specific channels have a fixed shard; channels_redis
+        # spreads normal ones round robin, those aren't counted per shard
+        if '!' not in channel:
+            return await super().send(channel, message)
+        index = self.consistent_hash(channel)
+        return await self._tracked('send', index, super().send(channel, message))
+
+    async def group_add(self, group, channel):
+        return await self._tracked('group_add', self.consistent_hash(group), super().group_add(group, channel))
+
+    async def group_discard(self, group, channel):
+        return await self._tracked('group_discard', self.consistent_hash(group), super().group_discard(group, channel))
+
+    async def group_send(self, group, message):
+        return await self._tracked('group_send', self.consistent_hash(group), super().group_send(group, message))
+
+    def _map_channel_keys_to_connection(self, channel_names, message):
+        mapping = super()._map_channel_keys_to_connection(channel_names, message)
+        for index, keys in mapping[0].items():
+            CHANNEL_LAYER_SHARD_DELIVERIES.labels(self.shard_names[index]).inc(len(keys))
+        return mapping
+
+    async def shard_health(self):
+        """{shard: round trip in seconds, or None if it's down} from a PING to every shard."""
+        health = {}
+        for index, shard in enumerate(self.shard_names):
+            start = time.perf_counter()
+            try:
+                await self._tracked('ping', index, self.connection(index).ping())
+            except Exception:
+                health[shard] = None
+            else:
+                health[shard] = time.perf_counter() - start
+        return health
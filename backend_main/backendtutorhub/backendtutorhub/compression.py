@@ -0,0 +1,122 @@
+"""
+Response compression with content negotiation between brotli and gzip.
+
+Like django.middleware.gzip.GZipMiddleware, but it also speaks brotli (when
+the Brotli package is installed), only kicks in above COMPRESSION_MIN_SIZE
+bytes and works in both the sync and the async middleware chain.
+
+Both encodings get GZipMiddleware's BREACH mitigation: a random number of
+junk bytes that decoders skip, so the compressed length of a response
+doesn't reveal how well a secret in it matched attacker input.
+"""
+import re
+import secrets
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+_accept_encoding_re = re.compile(r'\s*([^\s;,]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?')
+
+
+def accepted_encodings(header):
+    """Encodings from an Accept-Encoding header, without the q=0 ones."""
+    accepted = set()
+    for part in header.split(','):
+        match = _accept_encoding_re.match(part)
+        if not match:
+            continue
+        encoding, q = match.groups()
+        try:
+            if q is not None and float(q) == 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(encoding.lower())
+    return accepted
+
+
+def compress_brotli(content, quality, max_random_bytes=0):
+    """
+    brotli.compress() plus, with max_random_bytes, a metadata meta-block of
+    1 to max_random_bytes (at most 256) random bytes in front of the data.
+    Metadata is ignored by decoders (RFC 7932, section 9.2).
+    """
+    compressor = brotli.Compressor(quality=quality)
+    if not max_random_bytes:
+        return compressor.process(content) + compressor.finish()
+    # flush() leaves the stream byte-aligned right after the header
+    header = compressor.flush()
+    length = 1 + secrets.randbelow(min(max_random_bytes, 256))
+    # ISLAST=0, MNIBBLES=0 (metadata), reserved=0, MSKIPBYTES=1, then
+    # MSKIPLEN-1 in 8 bits straddling both bytes, zero-padded
+    metadata = bytes([0x16 | ((length - 1) & 0x3) << 6, (length - 1) >> 2]) + secrets.token_bytes(length)
+    return header + metadata + compressor.process(content) + compressor.finish()
+
+
+class CompressionMiddleware:
+    sync_capable = True
+    async_capable = True
+    # BREACH mitigation, for both gzip and brotli
+    max_random_bytes = 100
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_size = getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+        self.brotli_quality = getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 5)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        return self.process_response(request, response)
+
+    def choose_encoding(self, request):
+        accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if brotli is not None and 'br' in accepted:
+            return 'br'
+        if 'gzip' in accepted:
+            return 'gzip'
+        return None
+
+    def process_response(self, request, response):
+        # Only plain responses that are big enough to be worth it
+        if response.streaming or len(response.content) < self.min_size:
+            return response
+        if response.has_header('Content-Encoding'):
+            return response
+        if 'no-transform' in response.get('Cache-Control', ''):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        encoding = self.choose_encoding(request)
+        if encoding is None:
+            return response
+
+        if encoding == 'br':
+            compressed = compress_brotli(response.content, self.brotli_quality, self.max_random_bytes)
+        else:
+            compressed = compress_string(response.content, max_random_bytes=self.max_random_bytes)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(response.content))
+        # The body differs byte-wise from the uncompressed one
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
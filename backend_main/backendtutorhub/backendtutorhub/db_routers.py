@@ -0,0 +1,164 @@
+"""
+Primary/replica database routing.
+
+Replica aliases come from DATABASE_REPLICA_URLS (see settings.py). Reads are
+spread round-robin over the replicas that passed their last health check and
+fall back to the primary ('default') when none did. Writes always go to the
+primary.
+
+Reads are pinned to the primary:
+- for the whole of a non-safe request (POST, PUT, PATCH, DELETE), so
+  validation and the response are computed from the rows being written;
+- for DATABASE_PIN_SECONDS after such a request, through a cookie, so the
+  client that just wrote reads its own writes while replicas catch up;
+- inside `with use_primary():` blocks, for code outside a request.
+
+Locally two aliases on the same SQLite file are enough to try it out:
+    DATABASE_URL=sqlite:///db.sqlite3 DATABASE_REPLICA_URLS=sqlite:///db.sqlite3
+"""
+import contextlib
+import contextvars
+import logging
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_pinned_to_primary = contextvars.ContextVar('db_pinned_to_primary', default=False)
+
+
+@contextlib.contextmanager
+def use_primary():
+    """Send every read in this block to the primary."""
+    token = _pinned_to_primary.set(True)
+    try:
+        yield
+    finally:
+        _pinned_to_primary.reset(token)
+
+
+class ReplicaPool:
+    """
+    Round-robin over the replica aliases, skipping the ones whose last
+    health check failed. A replica is re-checked at most every
+    DATABASE_REPLICA_CHECK_INTERVAL seconds.
+    """
+
+    def __init__(self, aliases):
+        self.aliases = list(aliases)
+        self._lock = threading.Lock()
+        self._next = 0
+        # alias -> (healthy, checked_at)
+        self._health = {}
+
+    def choose(self):
+        for _ in range(len(self.aliases)):
+            with self._lock:
+                alias = self.aliases[self._next % len(self.aliases)]
+                self._next += 1
+            if self.is_healthy(alias):
+                return alias
+        return None
+
+    def is_healthy(self, alias):
+        interval = getattr(settings, 'DATABASE_REPLICA_CHECK_INTERVAL', 30)
+        healthy, checked_at = self._health.get(alias, (None, 0.0))
+        if healthy is not None and time.monotonic() - checked_at < interval:
+            return healthy
+
+        try:
+            # A real round trip on every backend; is_usable() is a no-op
+            # on SQLite
+            with connections[alias].cursor() as cursor:
+                cursor.execute('SELECT 1')
+            healthy = True
+        except Exception:
+            logger.warning("Database replica %s failed its health check", alias, exc_info=True)
+            healthy = False
+        self._health[alias] = (healthy, time.monotonic())
+        return healthy
+
+
+class PrimaryReplicaRouter:
+
+    def __init__(self):
+        self.replicas = ReplicaPool(getattr(settings, 'DATABASE_REPLICAS', []))
+
+    def db_for_read(self, model, **hints):
+        if _pinned_to_primary.get():
+            return DEFAULT_DB_ALIAS
+        return self.replicas.choose() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        databases = {DEFAULT_DB_ALIAS, *self.replicas.aliases}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
+
+
+class ReadYourWritesMiddleware:
+    """
+    Pins reads to the primary for non-safe requests, and for requests from a
+    client that did a successful write less than DATABASE_PIN_SECONDS ago.
+    """
+    sync_capable = True
+    async_capable = True
+    cookie_name = 'db_primary_until'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.pin_seconds = getattr(settings, 'DATABASE_PIN_SECONDS', 5)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _pinned_to_primary.set(self.should_pin(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            _pinned_to_primary.reset(token)
+        return self.process_response(request, response)
+
+    async def __acall__(self, request):
+        token = _pinned_to_primary.set(self.should_pin(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _pinned_to_primary.reset(token)
+        return self.process_response(request, response)
+
+    def should_pin(self, request):
+        if request.method not in SAFE_METHODS:
+            return True
+        try:
+            return float(request.COOKIES.get(self.cookie_name, 0)) > time.time()
+        except ValueError:
+            return False
+
+    def process_response(self, request, response):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            # The value is only a hint; a forged one just costs primary reads
+            response.set_cookie(
+                self.cookie_name,
+                str(time.time() + self.pin_seconds),
+                max_age=self.pin_seconds,
+                httponly=True,
+                samesite=getattr(settings, 'DATABASE_PIN_COOKIE_SAMESITE', 'Lax'),
+                secure=getattr(settings, 'DATABASE_PIN_COOKIE_SAMESITE', 'Lax') == 'None',
+            )
+        return response
@@ -0,0 +1,232 @@
+"""
+Prometheus metrics for the HTTP API, the chat websocket, the database and
+its connection pool.
+
+Everything is collected in-process with prometheus_client and served as
+Prometheus text from /metrics; there's no agent or push gateway involved.
+
+Multi-process servers (gunicorn workers, several daphne processes): set the
+PROMETHEUS_MULTIPROC_DIR environment variable to an empty, writable directory
+shared by all workers of one host before they start. Each process then writes
+its samples there and /metrics aggregates all of them. The directory has to
+be wiped on deploy, and gunicorn should call mark_process_dead() from its
+child_exit hook so the websocket gauge drops connections of dead workers.
+The connection pool series are read from the pools at scrape time and so
+only describe the process that answered the scrape.
+"""
+import hmac
+import os
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+HTTP_REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds',
+    'Time spent handling an HTTP request, by route.',
+    ['method', 'route'],
+)
+HTTP_RESPONSES = Counter(
+    'http_responses_total',
+    'HTTP responses, by route and status code.',
+    ['method', 'route', 'status'],
+)
+WEBSOCKET_CONNECTIONS = Gauge(
+    'websocket_connections_open',
+    'Currently open websocket connections.',
+    ['consumer'],
+    multiprocess_mode='livesum',
+)
+CHAT_MESSAGES_RECEIVED = Counter(
+    'chat_messages_received_total',
+    'Chat messages received from websocket clients.',
+)
+CHAT_MESSAGES_DELIVERED = Counter(
+    'chat_messages_delivered_total',
+    'Chat messages pushed to websocket clients.',
+)
+CHANNEL_LAYER_DURATION = Histogram(
+    'channel_layer_operation_duration_seconds',
+    'Latency of channel layer calls (group_send, group_add, ...).',
+    ['operation'],
+    buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1.0),
+)
+CHANNEL_LAYER_SHARD_OPERATIONS = Counter(
+    'channel_layer_shard_operations_total',
+    'Channel layer calls by the shard that served them.',
+    ['shard', 'operation'],
+)
+CHANNEL_LAYER_SHARD_DELIVERIES = Counter(
+    'channel_layer_shard_deliveries_total',
+    'Messages written to channel queues on each shard by group_send.',
+    ['shard'],
+)
+CHANNEL_LAYER_SHARD_ERRORS = Counter(
+    'channel_layer_shard_errors_total',
+    'Failed channel layer calls, by shard.',
+    ['shard', 'operation'],
+)
+CHANNEL_LAYER_SHARD_UP = Gauge(
+    'channel_layer_shard_up',
+    '1 if the last call to the shard succeeded, 0 if it failed.',
+    ['shard'],
+    multiprocess_mode='liveall',
+)
+DB_QUERY_DURATION = Histogram(
+    'db_query_duration_seconds',
+    'Duration of database queries; the _count series is the number of queries.',
+    ['alias'],
+    buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1.0, 2.5),
+)
+
+
+def mark_process_dead(pid):
+    """Call from gunicorn's child_exit hook in multi-process mode."""
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        multiprocess.mark_process_dead(pid)
+
+
+def _time_db(execute, sql, params, many, context):
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        DB_QUERY_DURATION.labels(context['connection'].alias).observe(time.perf_counter() - start)
+
+
+def _add_db_wrapper(sender, connection, **kwargs):
+    if _time_db not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_db)
+
+
+# Every connection (HTTP views, consumers, management commands) gets timed
+connection_created.connect(_add_db_wrapper, dispatch_uid='metrics_db_wrapper')
+
+
+def db_pool_stats():
+    """{alias: psycopg_pool stats} for the connection pools of this process."""
+    if not any(db.get('OPTIONS', {}).get('pool') for db in settings.DATABASES.values()):
+        return {}
+    from django.db.backends.postgresql.base import DatabaseWrapper
+
+    # Pools are created on first use, there's nothing to report before that
+    return {alias: pool.get_stats() for alias, pool in list(DatabaseWrapper._connection_pools.items())}
+
+
+class DatabasePoolCollector:
+    gauges = [
+        ('db_pool_size', 'Connections currently held by the pool.', 'pool_size'),
+        ('db_pool_max_size', 'Maximum number of connections in the pool.', 'pool_max'),
+        ('db_pool_available', 'Idle connections in the pool.', 'pool_available'),
+        ('db_pool_waiting', 'Requests currently waiting for a connection.', 'requests_waiting'),
+    ]
+    counters = [
+        ('db_pool_requests', 'Connections requested from the pool.', 'requests_num'),
+        ('db_pool_requests_queued', 'Requests that had to wait for a connection.', 'requests_queued'),
+        ('db_pool_requests_errors', 'Requests that timed out waiting for a connection.', 'requests_errors'),
+        ('db_pool_connections_lost', 'Connections found broken by the health check.', 'connections_lost'),
+    ]
+
+    def collect(self):
+        stats = db_pool_stats()
+        if not stats:
+            return
+
+        for name, documentation, key in self.gauges:
+            family = GaugeMetricFamily(name, documentation, labels=['alias'])
+            for alias, values in stats.items():
+                family.add_metric([alias], values.get(key, 0))
+            yield family
+
+        in_use = GaugeMetricFamily('db_pool_in_use', 'Connections currently checked out.', labels=['alias'])
+        wait = CounterMetricFamily('db_pool_wait_seconds', 'Total time spent waiting for a connection.', labels=['alias'])
+        for alias, values in stats.items():
+            in_use.add_metric([alias], values.get('pool_size', 0) - values.get('pool_available', 0))
+            wait.add_metric([alias], values.get('requests_wait_ms', 0) / 1000)
+        yield in_use
+        yield wait
+
+        for name, documentation, key in self.counters:
+            family = CounterMetricFamily(name, documentation, labels=['alias'])
+            for alias, values in stats.items():
+                family.add_metric([alias], values.get(key, 0))
+            yield family
+
+
+DB_POOL_COLLECTOR = DatabasePoolCollector()
+REGISTRY.register(DB_POOL_COLLECTOR)
+
+
+class MetricsMiddleware:
+    """
+    Records latency and status code per route. The route is the URL pattern
+    (e.g. 'api/courses/<uuid:pk>/') rather than the path so the number of
+    series stays bounded.
+
+    Works in both sync and async stacks so it doesn't force the async views
+    back onto a thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        response = self.get_response(request)
+        self.record(request, response, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self.record(request, response, time.perf_counter() - start)
+        return response
+
+    def record(self, request, response, duration):
+        match = request.resolver_match
+        route = match.route if match is not None else 'unmatched'
+        HTTP_REQUEST_DURATION.labels(request.method, route).observe(duration)
+        HTTP_RESPONSES.labels(request.method, route, str(response.status_code)).inc()
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint. If METRICS_TOKEN is set the scraper has to
+    send it as a bearer token. Without a token it's only open with DEBUG on.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if not token:
+        if not settings.DEBUG:
+            return HttpResponseForbidden()
+    elif not hmac.compare_digest(
+        request.headers.get('Authorization', '').encode(),
+        f'Bearer {token}'.encode(),
+    ):
+        return HttpResponseForbidden()
+
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(DB_POOL_COLLECTOR)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
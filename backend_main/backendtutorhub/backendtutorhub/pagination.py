@@ -0,0 +1,10 @@
+from rest_framework import pagination
+
+
+class LimitOffsetPagination(pagination.LimitOffsetPagination):
+    """
+    There's no PAGE_SIZE, so lists are only paginated when the client sends
+    ?limit=, in which case they come back as {count, next, previous,
+    results}. The async views paginate the same way.
+    """
+    max_limit = 1000
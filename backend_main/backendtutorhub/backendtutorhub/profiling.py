@@ -0,0 +1,244 @@
+"""
+Opt-in request profiling for the HTTP API and the websocket consumers.
+
+Turn it on with PROFILING_ENABLED=1. Every profiled request/event gets its
+time split into DB queries, DRF serialization, DRF authentication and total.
+HTTP responses carry a `Server-Timing` header with those numbers and each
+request also produces one JSON log line on the `backendtutorhub.profiling`
+logger. A cProfile dump (.prof, open it with pstats or snakeviz) is written to
+PROFILING_DUMP_DIR for a random PROFILING_SAMPLE_RATE share of requests and
+for every request slower than PROFILING_SLOW_MS.
+
+When profiling is disabled the middleware removes itself from the stack
+(MiddlewareNotUsed) and no hooks are installed, so there's nothing left on
+the request path.
+"""
+import contextvars
+import cProfile
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+
+from channels.consumer import get_handler_name
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+# Timings of the request/event currently being profiled, None otherwise
+_current = contextvars.ContextVar('profiling_current', default=None)
+
+_install_lock = threading.Lock()
+_installed = False
+
+
+def profiling_enabled():
+    return getattr(settings, 'PROFILING_ENABLED', False)
+
+
+class Profile:
+    """
+    Collects the timings of one request or consumer event.
+
+    Use it as a context manager around the code being measured; the DB,
+    serializer and auth hooks add to whichever Profile is active in the
+    current context.
+    """
+
+    def __init__(self, label):
+        self.label = label
+        self.db = 0.0
+        self.db_queries = 0
+        self.serializer = 0.0
+        self.auth = 0.0
+        self.total = 0.0
+        self.profiler = None
+        self._sampled = False
+        self._start = None
+        self._token = None
+
+    def __enter__(self):
+        sample_rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0.0)
+        self._sampled = sample_rate > 0 and random.random() < sample_rate
+        # With a slow threshold we can't know in advance which requests will
+        # need a dump, so all of them run under the profiler.
+        if self._sampled or getattr(settings, 'PROFILING_SLOW_MS', None):
+            self.profiler = cProfile.Profile()
+            try:
+                self.profiler.enable()
+            except ValueError:
+                # Another profiler is already active on this thread
+                self.profiler = None
+        self._token = _current.set(self)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.total = time.perf_counter() - self._start
+        if self.profiler is not None:
+            self.profiler.disable()
+        _current.reset(self._token)
+        return False
+
+    def server_timing(self):
+        """Value for the Server-Timing response header (durations in ms)."""
+        return ', '.join([
+            f'db;dur={self.db * 1000:.1f};desc="{self.db_queries} queries"',
+            f'ser;dur={self.serializer * 1000:.1f}',
+            f'auth;dur={self.auth * 1000:.1f}',
+            f'total;dur={self.total * 1000:.1f}',
+        ])
+
+    def report(self, **fields):
+        """Log one structured line and write the cProfile dump if needed."""
+        slow_ms = getattr(settings, 'PROFILING_SLOW_MS', None)
+        total_ms = self.total * 1000
+        dump_path = None
+        if self.profiler is not None and (self._sampled or (slow_ms and total_ms >= slow_ms)):
+            dump_path = self._dump()
+
+        line = {
+            'label': self.label,
+            'total_ms': round(total_ms, 2),
+            'db_ms': round(self.db * 1000, 2),
+            'db_queries': self.db_queries,
+            'serializer_ms': round(self.serializer * 1000, 2),
+            'auth_ms': round(self.auth * 1000, 2),
+            'profile': dump_path,
+        }
+        line.update(fields)
+        logger.info(json.dumps(line, default=str))
+
+    def _dump(self):
+        dump_dir = getattr(settings, 'PROFILING_DUMP_DIR', 'profiles')
+        os.makedirs(dump_dir, exist_ok=True)
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', self.label).strip('_')[:80]
+        filename = f'{time.strftime("%Y%m%d-%H%M%S")}-{slug}-{self.total * 1000:.0f}ms-{os.getpid()}.prof'
+        path = os.path.join(dump_dir, filename)
+        self.profiler.dump_stats(path)
+        return path
+
+
+def _time_db(execute, sql, params, many, context):
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.db += time.perf_counter() - start
+        profile.db_queries += 1
+
+
+def _add_db_wrapper(sender, connection, **kwargs):
+    if _time_db not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_db)
+
+
+def _timed(func, attr):
+    def wrapper(*args, **kwargs):
+        profile = _current.get()
+        if profile is None:
+            return func(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            setattr(profile, attr, getattr(profile, attr) + time.perf_counter() - start)
+    wrapper.__wrapped__ = func
+    return wrapper
+
+
+def install():
+    """
+    Hook the DB cursor, DRF serialization and DRF authentication once per
+    process. Only called when profiling is enabled.
+    """
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        from django.db import connections
+        from rest_framework import request as drf_request
+        from rest_framework import serializers
+
+        connection_created.connect(_add_db_wrapper, dispatch_uid='profiling_db_wrapper')
+        # Connections opened before we got here
+        for conn in connections.all(initialized_only=True):
+            _add_db_wrapper(None, conn)
+
+        # Serializer.data / ListSerializer.data both resolve to this property
+        # through super(), and it's the only place the top-level
+        # to_representation() is called from, so nested serializers aren't
+        # counted twice.
+        data = serializers.BaseSerializer.data
+        serializers.BaseSerializer.data = property(_timed(data.fget, 'serializer'))
+        drf_request.Request._authenticate = _timed(drf_request.Request._authenticate, 'auth')
+        _installed = True
+
+
+class ProfilingMiddleware:
+    """
+    Profiles requests whose path starts with one of PROFILING_PATH_PREFIXES
+    and adds a Server-Timing header to their responses.
+    """
+
+    def __init__(self, get_response):
+        if not profiling_enabled():
+            raise MiddlewareNotUsed
+        install()
+        self.get_response = get_response
+        self.prefixes = tuple(getattr(settings, 'PROFILING_PATH_PREFIXES', ('/api/',)))
+
+    def __call__(self, request):
+        if not request.path.startswith(self.prefixes):
+            return self.get_response(request)
+
+        with Profile(f'{request.method} {request.path}') as profile:
+            response = self.get_response(request)
+        response['Server-Timing'] = profile.server_timing()
+        profile.report(
+            kind='http',
+            method=request.method,
+            path=request.path,
+            status=response.status_code,
+        )
+        return response
+
+
+class ProfilingConsumerMixin:
+    """
+    Channels equivalent of ProfilingMiddleware for SyncConsumer subclasses
+    (JsonWebsocketConsumer etc). Each dispatched event (connect, receive,
+    group messages, ...) is profiled in the worker thread it runs on.
+    There is no response header on a websocket, so only the log line and
+    the sampled dumps are produced.
+    """
+
+    def _dispatch_handler(self, message):
+        handler = getattr(self, get_handler_name(message), None)
+        if handler is None:
+            raise ValueError("No handler for message type %s" % message["type"])
+        if not profiling_enabled():
+            return handler(message)
+
+        install()
+        path = self.scope.get('path', '')
+        with Profile(f'{message["type"]} {path}') as profile:
+            handler(message)
+        profile.report(
+            kind='websocket',
+            consumer=type(self).__name__,
+            event=message['type'],
+            path=path,
+        )
+
+    async def dispatch(self, message):
+        await database_sync_to_async(self._dispatch_handler)(message)
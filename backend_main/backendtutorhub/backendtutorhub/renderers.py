@@ -0,0 +1,108 @@
+"""
+JSON renderer and parser backed by orjson.
+
+orjson serializes the UUID primary keys and datetimes used by Course, User
+and Message natively and is several times faster than the stdlib json module
+DRF uses. When orjson isn't installed both classes behave exactly like DRF's
+JSONRenderer / JSONParser.
+
+The output parses to the same data as DRF's, but isn't always the same
+bytes: orjson writes floats in exponent notation without the sign and
+padding Python's repr() uses (1e20 and 1e-7 rather than 1e+20 and 1e-07).
+Data orjson can't encode (integers above 64 bits, ...) and NaN or infinity,
+which orjson would silently turn into null, go through DRF's renderer, so
+they're rendered or rejected exactly as DRF does.
+"""
+import math
+from decimal import Decimal
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_encoder = JSONEncoder()
+
+
+def _default(obj):
+    # Whatever orjson can't handle natively (Decimal, lazy translation
+    # strings, querysets, ...) goes through DRF's encoder
+    return _encoder.default(obj)
+
+
+def _has_non_finite(data):
+    stack = [data]
+    while stack:
+        obj = stack.pop()
+        if isinstance(obj, float):
+            if not math.isfinite(obj):
+                return True
+        elif isinstance(obj, Decimal):
+            if not obj.is_finite():
+                return True
+        elif isinstance(obj, dict):
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple)):
+            stack.extend(obj)
+    return False
+
+
+def _orjson_dumps(data):
+    # None when orjson can't produce what DRF would
+    try:
+        ret = orjson.dumps(
+            data,
+            default=_default,
+            # UTC datetimes as ...Z, same as DRF's encoder
+            option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS,
+        )
+    except orjson.JSONEncodeError:
+        return None
+    # NaN and infinity come out as null, DRF raises for them (or writes NaN
+    # with STRICT_JSON off). Only worth looking for when there's a null.
+    if b'null' in ret and _has_non_finite(data):
+        return None
+    # DRF escapes these so the output is also valid JavaScript
+    if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+        ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+    return ret
+
+
+def dumps(data):
+    """Serialize `data` to compact UTF-8 JSON bytes, like DRF's default output."""
+    ret = _orjson_dumps(data) if orjson is not None else None
+    if ret is None:
+        return JSONRenderer().render(data)
+    return ret
+
+
+class FastJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        # orjson only knows 2-space indentation; indented output is for
+        # humans anyway, so leave it to the stdlib path
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = _orjson_dumps(data)
+        if ret is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
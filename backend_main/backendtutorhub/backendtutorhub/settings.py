@@ -42,6 +42,9 @@ INSTALLED_APPS = [
     'corsheaders',
     'message_service',
     'django_filters',
+    'benchmarks',
+    'jobs_service',
+    'sync_service',
 
     'django.contrib.admin',
     'django.contrib.auth',
@@ -59,6 +62,9 @@ CORS_ALLOWED_ORIGINS = [
 ]
 
 MIDDLEWARE = [
+    'backendtutorhub.metrics.MetricsMiddleware',
+    'backendtutorhub.profiling.ProfilingMiddleware',  # no-op unless PROFILING_ENABLED
+    'backendtutorhub.compression.CompressionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.security.SecurityMiddleware',
@@ -69,6 +75,22 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
+
+# Request profiling (see backendtutorhub/profiling.py), off by default
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '0') == '1'
+PROFILING_PATH_PREFIXES = ('/api/',)
+# Share of profiled requests that get a cProfile dump, 0.0 - 1.0
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', '0'))
+# Always dump requests slower than this many ms (unset = never)
+PROFILING_SLOW_MS = float(os.environ['PROFILING_SLOW_MS']) if os.environ.get('PROFILING_SLOW_MS') else None
+PROFILING_DUMP_DIR = os.environ.get('PROFILING_DUMP_DIR', str(BASE_DIR / 'profiles'))
+
+# Prometheus scrape endpoint (/metrics). If set, scrapers must send
+# "Authorization: Bearer <METRICS_TOKEN>"; if unset, /metrics is only served
+# with DEBUG on. For multi-process servers also set
+# PROMETHEUS_MULTIPROC_DIR, see backendtutorhub/metrics.py.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
 from datetime import timedelta
 
 SIMPLE_JWT = {
@@ -87,8 +109,23 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ),
      'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
+    # orjson backed when installed, stdlib json otherwise
+    'DEFAULT_RENDERER_CLASSES': [
+        'backendtutorhub.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'backendtutorhub.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
+# Responses smaller than this (bytes) aren't compressed
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', '1024'))
+# 0-11; 4-6 is the usual sweet spot for dynamic responses
+COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', '5'))
+
 ROOT_URLCONF = 'backendtutorhub.urls'
 
 TEMPLATES = [
@@ -111,14 +148,19 @@ WSGI_APPLICATION = 'backendtutorhub.wsgi.application'
 
 # Channel Layer configuration
 # Using Redis as the channel layer
+# Comma separated redis:// URLs. With more than one, groups and channels are
+# spread over them by consistent hashing (backendtutorhub.channel_layers)
+CHANNEL_REDIS_URLS = [u.strip() for u in os.environ.get('CHANNEL_REDIS_URLS', '').split(',') if u.strip()]
 CHANNEL_LAYERS = {
     "default": {
         "BACKEND": "channels_redis.core.RedisChannelLayer",
         "CONFIG": {
-            "hosts": [("localhost", 6379)], # Replace with your Redis host and port if different
+            "hosts": CHANNEL_REDIS_URLS or [("localhost", 6379)], # Replace with your Redis host and port if different
         },
     },
 }
+if len(CHANNEL_REDIS_URLS) > 1:
+    CHANNEL_LAYERS["default"]["BACKEND"] = "backendtutorhub.channel_layers.ShardedRedisChannelLayer"
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -146,6 +188,52 @@ DATABASES = {
     #     'PORT': '',                 # Leave empty for default port (5432)
     # }
 }
+
+# Read replicas, comma separated database URLs. Safe-method reads are spread
+# over them by backendtutorhub.db_routers.PrimaryReplicaRouter.
+DATABASE_REPLICAS = []
+for index, url in enumerate(u.strip() for u in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if u.strip()):
+    alias = f'replica_{index}'
+    DATABASES[alias] = dj_database_url.parse(url, conn_max_age=600)
+    # Tests run against the primary only
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS.append(alias)
+
+# Seconds a client's reads stay on the primary after it wrote something
+DATABASE_PIN_SECONDS = int(os.environ.get('DATABASE_PIN_SECONDS', '5'))
+# 'None' if the frontend is on another site (the cookie is then also Secure)
+DATABASE_PIN_COOKIE_SAMESITE = os.environ.get('DATABASE_PIN_COOKIE_SAMESITE', 'Lax')
+# Seconds between health checks of a replica
+DATABASE_REPLICA_CHECK_INTERVAL = int(os.environ.get('DATABASE_REPLICA_CHECK_INTERVAL', '30'))
+
+# Connection pooling (psycopg 3 + psycopg_pool, PostgreSQL only). Without it
+# every executor thread of every process keeps its own connection open for
+# CONN_MAX_AGE. With it each process shares at most DATABASE_POOL_MAX_SIZE
+# connections per database; a request waits up to DATABASE_POOL_TIMEOUT
+# seconds for a free one and connections are checked before being handed out.
+DATABASE_POOL = os.environ.get('DATABASE_POOL', '') in ('1', 'true', 'True')
+DATABASE_POOL_OPTIONS = {
+    'min_size': int(os.environ.get('DATABASE_POOL_MIN_SIZE', '2')),
+    'max_size': int(os.environ.get('DATABASE_POOL_MAX_SIZE', '10')),
+    'timeout': float(os.environ.get('DATABASE_POOL_TIMEOUT', '10')),
+    # Idle connections above min_size are closed after this many seconds
+    'max_idle': float(os.environ.get('DATABASE_POOL_MAX_IDLE', '300')),
+    # Connections are recycled after this many seconds
+    'max_lifetime': float(os.environ.get('DATABASE_POOL_MAX_LIFETIME', '3600')),
+}
+for alias, database in DATABASES.items():
+    if database.get('ENGINE') != 'django.db.backends.postgresql':
+        continue
+    # Ping a persistent or pooled connection before reusing it
+    database['CONN_HEALTH_CHECKS'] = True
+    if DATABASE_POOL:
+        # The pool owns the connections, Django mustn't keep them around
+        database['CONN_MAX_AGE'] = 0
+        database.setdefault('OPTIONS', {})['pool'] = {**DATABASE_POOL_OPTIONS, 'name': alias}
+
+if DATABASE_REPLICAS:
+    DATABASE_ROUTERS = ['backendtutorhub.db_routers.PrimaryReplicaRouter']
+    MIDDLEWARE.append('backendtutorhub.db_routers.ReadYourWritesMiddleware')
 AUTH_USER_MODEL = 'users_service.User'
 
 # Password validation
@@ -167,6 +255,57 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Background jobs (jobs_service), run with `python manage.py run_jobs`
+# 'jobs_service.backends.RedisBackend' keeps the queue in Redis instead of the DB
+JOBS_BACKEND = os.environ.get('JOBS_BACKEND', 'jobs_service.backends.DatabaseBackend')
+JOBS_REDIS_URL = os.environ.get('JOBS_REDIS_URL', 'redis://localhost:6379/1')
+# Seconds after which a running job is considered abandoned and requeued
+JOBS_LOCK_TIMEOUT = 600
+# Cap for the exponential retry backoff, in seconds
+JOBS_MAX_BACKOFF = 3600
+
+# Email (sent from background jobs). Prints to the console unless configured.
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'Tutorite <no-reply@tutorite.local>')
+
+# Registration changes are pushed to teachers over ws/teacher/registrations/,
+# coalesced over this many seconds (0 sends every change on its own)
+REGISTRATION_EVENTS_WINDOW = float(os.environ.get('REGISTRATION_EVENTS_WINDOW', '0.5'))
+
+# Delta sync (/api/sync/)
+SYNC_PAGE_SIZE = 500
+SYNC_MAX_PAGE_SIZE = 2000
+# On databases other than PostgreSQL, changes are only served once they're
+# this old. Transactions that write synced objects must commit within it or
+# their changes can be skipped by a cursor.
+SYNC_SETTLE_SECONDS = float(os.environ.get('SYNC_SETTLE_SECONDS', '1'))
+# Cursors older than this get 410 Gone; prune_sync_log deletes entries past it
+SYNC_LOG_RETENTION_DAYS = int(os.environ.get('SYNC_LOG_RETENTION_DAYS', '30'))
+
+# Admin changelists of big tables (backendtutorhub.admin_tools) show the
+# planner's row estimate instead of an exact count above this many rows
+ADMIN_EXACT_COUNT_LIMIT = 10000
+ADMIN_DELETE_BATCH_SIZE = 1000
+
+
+# Logging
+# https://docs.djangoproject.com/en/5.2/topics/logging/
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'root': {
+        'handlers': ['console'],
+        'level': os.environ.get('DJANGO_LOG_LEVEL', 'INFO'),
+    },
+}
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
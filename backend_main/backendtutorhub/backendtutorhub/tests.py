@@ -0,0 +1,557 @@
+import gzip
+import json
+import uuid
+from collections import Counter
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock, skipIf, skipUnless
+
+from asgiref.sync import async_to_sync
+from channels_redis.core import RedisChannelLayer
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.http import HttpResponse
+from django.contrib.admin.sites import site
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from course_service.models import Course, CourseRegistration
+from message_service.models import Message
+from users_service.models import User, UserRole
+from . import compression, db_routers, renderers
+from .channel_layers import HashRing, ShardedRedisChannelLayer, shard_name
+from .compression import CompressionMiddleware
+from .metrics import metrics_view
+from .db_routers import PrimaryReplicaRouter, ReadYourWritesMiddleware, use_primary
+
+
+@override_settings(DATABASE_REPLICAS=['replica_a', 'replica_b'])
+class PrimaryReplicaRouterTests(SimpleTestCase):
+
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        self.healthy = {'replica_a': True, 'replica_b': True}
+        patcher = mock.patch.object(self.router.replicas, 'is_healthy', side_effect=lambda alias: self.healthy[alias])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def reads(self, n):
+        return [self.router.db_for_read(Course) for _ in range(n)]
+
+    def test_reads_round_robin_over_replicas(self):
+        self.assertEqual(self.reads(4), ['replica_a', 'replica_b', 'replica_a', 'replica_b'])
+
+    def test_unhealthy_replica_is_skipped(self):
+        self.healthy['replica_a'] = False
+        self.assertEqual(self.reads(3), ['replica_b'] * 3)
+
+    def test_primary_when_no_replica_is_healthy(self):
+        self.healthy = dict.fromkeys(self.healthy, False)
+        self.assertEqual(self.reads(2), [DEFAULT_DB_ALIAS] * 2)
+
+    def test_use_primary(self):
+        with use_primary():
+            self.assertEqual(self.reads(2), [DEFAULT_DB_ALIAS] * 2)
+        self.assertEqual(self.reads(1), ['replica_a'])
+
+    def test_writes_go_to_primary(self):
+        self.assertEqual(self.router.db_for_write(Course), DEFAULT_DB_ALIAS)
+
+
+@override_settings(DATABASE_PIN_SECONDS=5, DATABASE_PIN_COOKIE_SAMESITE='Lax')
+class ReadYourWritesMiddlewareTests(SimpleTestCase):
+    """Pinning is observed through the flag the router reads."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def view(self, status=200):
+        def get_response(request):
+            request.pinned = db_routers._pinned_to_primary.get()
+            return HttpResponse(status=status)
+        return get_response
+
+    def call(self, request, status=200):
+        response = ReadYourWritesMiddleware(self.view(status))(request)
+        return request.pinned, response
+
+    def test_safe_request_is_not_pinned(self):
+        pinned, response = self.call(self.factory.get('/'))
+        self.assertFalse(pinned)
+        self.assertNotIn(ReadYourWritesMiddleware.cookie_name, response.cookies)
+
+    def test_write_is_pinned_and_sets_cookie(self):
+        with mock.patch.object(db_routers.time, 'time', return_value=1000.0):
+            pinned, response = self.call(self.factory.post('/'))
+        self.assertTrue(pinned)
+        cookie = response.cookies[ReadYourWritesMiddleware.cookie_name]
+        self.assertEqual(float(cookie.value), 1005.0)
+        self.assertEqual(cookie['max-age'], 5)
+        self.assertTrue(cookie['httponly'])
+        self.assertEqual(cookie['samesite'], 'Lax')
+        self.assertFalse(cookie['secure'])
+        # Reset once the request is over
+        self.assertFalse(db_routers._pinned_to_primary.get())
+
+    def test_failed_write_is_pinned_without_cookie(self):
+        for status in (400, 403, 500):
+            pinned, response = self.call(self.factory.delete('/'), status=status)
+            self.assertTrue(pinned)
+            self.assertNotIn(ReadYourWritesMiddleware.cookie_name, response.cookies)
+
+    def test_cookie_pins_until_it_expires(self):
+        request = self.factory.get('/')
+        request.COOKIES[ReadYourWritesMiddleware.cookie_name] = '1005.0'
+        with mock.patch.object(db_routers.time, 'time', return_value=1004.0):
+            self.assertTrue(self.call(request)[0])
+        with mock.patch.object(db_routers.time, 'time', return_value=1006.0):
+            self.assertFalse(self.call(request)[0])
+
+    def test_garbage_cookie_is_ignored(self):
+        request = self.factory.get('/')
+        request.COOKIES[ReadYourWritesMiddleware.cookie_name] = 'forever'
+        self.assertFalse(self.call(request)[0])
+
+    @override_settings(DATABASE_PIN_COOKIE_SAMESITE='None')
+    def test_cross_site_cookie_is_secure(self):
+        cookie = self.call(self.factory.put('/'))[1].cookies[ReadYourWritesMiddleware.cookie_name]
+        self.assertEqual(cookie['samesite'], 'None')
+        self.assertTrue(cookie['secure'])
+
+    def test_async_chain(self):
+        sync_view = self.view()
+
+        async def get_response(request):
+            return sync_view(request)
+
+        middleware = ReadYourWritesMiddleware(get_response)
+        request = self.factory.post('/')
+        response = async_to_sync(middleware)(request)
+        self.assertTrue(request.pinned)
+        self.assertIn(ReadYourWritesMiddleware.cookie_name, response.cookies)
+
+
+class RecordingRouter(PrimaryReplicaRouter):
+    reads = []
+
+    def db_for_read(self, model, **hints):
+        alias = super().db_for_read(model, **hints)
+        self.reads.append(alias)
+        return alias
+
+
+@skipUnless(settings.DATABASE_REPLICAS, 'set DATABASE_REPLICA_URLS to run against a MIRROR replica alias')
+@override_settings(
+    DATABASE_ROUTERS=['backendtutorhub.tests.RecordingRouter'],
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+)
+class ReplicaMirrorTests(TransactionTestCase):
+    """
+    End to end through the middleware stack. The replica aliases are test
+    MIRRORs of the primary, so they see the rows this test writes. Not a
+    TestCase: the mirror is a connection of its own and only sees committed
+    rows, like a real replica.
+    """
+    databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+
+    def setUp(self):
+        self.teacher = User.objects.create(username='teacher', role=UserRole.TEACHER)
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+        RecordingRouter.reads = []
+        # Replicas start out healthy for every test
+        patcher = mock.patch.object(db_routers.ReplicaPool, 'is_healthy', return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def reads_of(self, method, path, data=None):
+        RecordingRouter.reads = []
+        response = getattr(self.client, method)(path, data, format='json')
+        return response, set(RecordingRouter.reads)
+
+    def test_read_your_writes(self):
+        response, reads = self.reads_of('get', '/api/courses/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(reads)
+        self.assertNotIn(DEFAULT_DB_ALIAS, reads)
+
+        response, reads = self.reads_of('post', '/api/courses/', {'title': 'Algebra', 'teacher': str(self.teacher.pk)})
+        self.assertEqual(response.status_code, 201, response.content)
+        # Validating the teacher is a read, it must see the primary
+        self.assertEqual(reads, {DEFAULT_DB_ALIAS})
+        self.assertIn(ReadYourWritesMiddleware.cookie_name, response.cookies)
+
+        # The client sends the cookie back and reads its write from the primary
+        response, reads = self.reads_of('get', '/api/courses/')
+        self.assertEqual([course['title'] for course in response.json()], ['Algebra'])
+        self.assertEqual(reads, {DEFAULT_DB_ALIAS})
+
+        self.client.cookies.pop(ReadYourWritesMiddleware.cookie_name)
+        response, reads = self.reads_of('get', '/api/courses/')
+        # The mirror sees the same rows
+        self.assertEqual([course['title'] for course in response.json()], ['Algebra'])
+        self.assertNotIn(DEFAULT_DB_ALIAS, reads)
+
+    def test_rejected_write_does_not_pin(self):
+        response, reads = self.reads_of('post', '/api/courses/', {'title': ''})
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn(ReadYourWritesMiddleware.cookie_name, response.cookies)
+        self.assertFalse(Course.objects.using(settings.DATABASE_REPLICAS[0]).exists())
+
+
+@override_settings(ADMIN_DELETE_BATCH_SIZE=2, CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class LargeTableAdminTests(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create(username='admin', is_staff=True, is_superuser=True)
+        self.client.force_login(self.admin)
+
+    def test_only_batched_delete_is_offered(self):
+        request = RequestFactory().get('/admin/')
+        request.user = self.admin
+        self.assertEqual(list(site._registry[Message].get_actions(request)), ['delete_in_batches'])
+
+    def test_delete_in_batches(self):
+        other = User.objects.create(username='other')
+        messages = [Message.objects.create(sender=self.admin, receiver=other, content=str(i)) for i in range(5)]
+        response = self.client.post('/admin/message_service/message/', {
+            'action': 'delete_in_batches',
+            '_selected_action': [m.pk for m in messages[:4]],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(list(Message.objects.values_list('pk', flat=True)), [messages[4].pk])
+
+
+@skipIf(renderers.orjson is None, 'orjson is not installed')
+class FastJSONRendererTests(SimpleTestCase):
+
+    def setUp(self):
+        self.renderer = renderers.FastJSONRenderer()
+
+    def assert_like_drf(self, data):
+        expected = JSONRenderer().render(data)
+        self.assertEqual(self.renderer.render(data), expected)
+        self.assertEqual(renderers.dumps(data), expected)
+
+    def test_same_bytes_as_drf(self):
+        self.assert_like_drf({
+            'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+            'created_at': datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=dt_timezone.utc),
+            'title': 'Élan \u2028 vital',
+            'price': Decimal('9.50'),
+            'tags': ('a', 'b'),
+            1: None,
+            'score': 0.25,
+        })
+
+    def test_floats_parse_to_the_same_values(self):
+        data = [1e20, 1e-7, 123.456, 5e-324]
+        self.assertNotEqual(self.renderer.render(data), JSONRenderer().render(data))
+        self.assertEqual(json.loads(self.renderer.render(data)), data)
+
+    def test_what_orjson_cannot_encode_goes_through_drf(self):
+        self.assert_like_drf({'big': 2 ** 70})
+        with self.assertRaises(TypeError):
+            self.renderer.render({'obj': object()})
+
+    def test_non_finite_numbers_are_rejected(self):
+        for value in (float('nan'), float('inf'), -float('inf'), Decimal('NaN')):
+            for render in (self.renderer.render, renderers.dumps):
+                with self.subTest(value=value), self.assertRaises(ValueError):
+                    render({'nested': [{'value': value}], 'other': None})
+
+    def test_non_finite_numbers_without_strict_json(self):
+        renderer = renderers.FastJSONRenderer()
+        renderer.strict = False
+        self.assertEqual(renderer.render({'value': float('nan')}), b'{"value":NaN}')
+
+    def test_indent_uses_drf(self):
+        self.assertEqual(
+            self.renderer.render({'a': 1}, 'application/json; indent=4'),
+            JSONRenderer().render({'a': 1}, 'application/json; indent=4'),
+        )
+
+
+@override_settings(COMPRESSION_MIN_SIZE=200)
+class CompressionMiddlewareTests(SimpleTestCase):
+    body = b'{"title": "Algebra"}' * 50
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def call(self, accept_encoding=None, body=None, **headers):
+        request = self.factory.get('/', HTTP_ACCEPT_ENCODING=accept_encoding) if accept_encoding else self.factory.get('/')
+        response = HttpResponse(self.body if body is None else body, content_type='application/json', headers=headers)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_gzip(self):
+        response = self.call('gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), self.body)
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    @skipIf(compression.brotli is None, 'Brotli is not installed')
+    def test_brotli_is_preferred(self):
+        response = self.call('gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(compression.brotli.decompress(response.content), self.body)
+
+    @skipIf(compression.brotli is None, 'Brotli is not installed')
+    def test_brotli_refused_with_q0(self):
+        self.assertEqual(self.call('br;q=0, gzip;q=0.5')['Content-Encoding'], 'gzip')
+
+    def test_brotli_not_installed(self):
+        with mock.patch.object(compression, 'brotli', None):
+            self.assertEqual(self.call('br, gzip')['Content-Encoding'], 'gzip')
+            self.assertNotIn('Content-Encoding', self.call('br'))
+
+    def test_no_accepted_encoding(self):
+        for accept_encoding in (None, 'identity', 'gzip;q=0'):
+            with self.subTest(accept_encoding=accept_encoding):
+                response = self.call(accept_encoding)
+                self.assertNotIn('Content-Encoding', response)
+                self.assertEqual(response.content, self.body)
+                self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_below_min_size(self):
+        body = self.body[:199]
+        response = self.call('gzip', body=body)
+        self.assertNotIn('Content-Encoding', response)
+        self.assertFalse(response.has_header('Vary'))
+        self.assertEqual(self.call('gzip', body=self.body[:200])['Content-Encoding'], 'gzip')
+
+    def test_random_padding(self):
+        self.assertGreater(len({len(self.call('gzip').content) for _ in range(20)}), 1)
+
+    def test_etag_is_weakened(self):
+        self.assertEqual(self.call('gzip', ETag='"abc"')['ETag'], 'W/"abc"')
+
+    def test_left_alone(self):
+        self.assertEqual(self.call('gzip', **{'Content-Encoding': 'identity'})['Content-Encoding'], 'identity')
+        self.assertNotIn('Content-Encoding', self.call('gzip', **{'Cache-Control': 'no-transform'}))
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class AsyncViewParityTests(TestCase):
+    """Each async view answers exactly like the sync view it mirrors."""
+
+    def setUp(self):
+        self.teacher = User.objects.create(username='teacher', role=UserRole.TEACHER)
+        other = User.objects.create(username='other', role=UserRole.TEACHER)
+        self.student = User.objects.create(username='student')
+        self.courses = [
+            Course.objects.create(title=f'Course {i}', teacher=self.teacher if i % 2 else other)
+            for i in range(5)
+        ]
+        for course in self.courses[:3]:
+            CourseRegistration.objects.create(student=self.student, course=course)
+
+    def token(self, user):
+        return f'Bearer {RefreshToken.for_user(user).access_token}'
+
+    def assert_same(self, sync_path, async_path, params=None, token=None):
+        headers = {'HTTP_AUTHORIZATION': token} if token else {}
+        expected = self.client.get(sync_path, params, **headers)
+        response = self.client.get(async_path, params, **headers)
+        self.assertEqual(response.status_code, expected.status_code, response.content)
+        # Pagination links point at the view that was called
+        self.assertEqual(response.content.replace(b'/async/', b'/'), expected.content)
+        self.assertEqual(response.get('WWW-Authenticate'), expected.get('WWW-Authenticate'))
+        return response
+
+    def test_public_course_list(self):
+        for params in (
+            None,
+            {'teacher': str(self.teacher.pk)},
+            {'teacher__username': 'other'},
+            {'teacher__username': 'nobody'},
+            {'teacher': '00000000-0000-0000-0000-000000000000'},
+            {'teacher': ''},
+        ):
+            with self.subTest(params=params):
+                self.assert_same('/api/courses/public/', '/api/async/courses/public/', params)
+
+    def test_invalid_uuid_filter(self):
+        response = self.assert_same('/api/courses/public/', '/api/async/courses/public/', {'teacher': 'not-a-uuid'})
+        self.assertEqual(response.status_code, 400)
+        for params in ({'id': 'nope'}, {'role': 'bogus'}):
+            with self.subTest(params=params):
+                response = self.assert_same('/api/users/users/public/', '/api/users/async/users/public/', params)
+                self.assertEqual(response.status_code, 400)
+
+    def test_limit_offset(self):
+        for params in (
+            {'limit': 2},
+            {'limit': 2, 'offset': 2},
+            {'limit': 2, 'offset': 4},
+            {'limit': 2, 'offset': 3},
+            {'limit': 2, 'offset': 50},
+            {'limit': 5000},
+            {'limit': 0},
+            {'limit': -1, 'offset': 1},
+            {'limit': 'x'},
+            {'limit': 2, 'offset': 'x'},
+            {'limit': 2, 'teacher__username': 'teacher'},
+        ):
+            with self.subTest(params=params):
+                self.assert_same('/api/courses/public/', '/api/async/courses/public/', params)
+        data = self.assert_same('/api/courses/public/', '/api/async/courses/public/', {'limit': 2, 'offset': 2}).json()
+        self.assertEqual(data['count'], 5)
+        self.assertEqual(len(data['results']), 2)
+        self.assertIsNotNone(data['next'])
+        self.assertIsNotNone(data['previous'])
+
+    def test_public_user_list(self):
+        for params in (None, {'role': 'teacher'}, {'username': 'student'}, {'limit': 1, 'offset': 1}):
+            with self.subTest(params=params):
+                self.assert_same('/api/users/users/public/', '/api/users/async/users/public/', params)
+
+    def test_course_detail(self):
+        course = self.courses[0]
+        self.assert_same(f'/api/courses/{course.pk}/', f'/api/async/courses/{course.pk}/')
+        missing = '00000000-0000-0000-0000-000000000000'
+        response = self.assert_same(f'/api/courses/{missing}/', f'/api/async/courses/{missing}/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_registrations(self):
+        response = self.assert_same('/api/registrations/', '/api/async/registrations/', token=self.token(self.student))
+        self.assertEqual(len(response.json()), 3)
+        self.assert_same('/api/registrations/', '/api/async/registrations/', {'limit': 2}, token=self.token(self.student))
+        response = self.assert_same('/api/registrations/', '/api/async/registrations/', token=self.token(self.teacher))
+        self.assertEqual(response.json(), [])
+
+    def test_jwt_errors(self):
+        user = User.objects.create(username='gone')
+        gone = self.token(user)
+        user.delete()
+        inactive = User.objects.create(username='inactive', is_active=False)
+        for token in (None, 'Bearer', 'Bearer garbage', 'Bearer a b', gone, self.token(inactive)):
+            with self.subTest(token=token):
+                response = self.assert_same('/api/registrations/', '/api/async/registrations/', token=token)
+                self.assertEqual(response.status_code, 401)
+        # A bad token is refused on public views too
+        response = self.assert_same('/api/courses/public/', '/api/async/courses/public/', token='Bearer garbage')
+        self.assertEqual(response.status_code, 401)
+        # Other schemes are ignored
+        response = self.assert_same('/api/courses/public/', '/api/async/courses/public/', token='Basic abc')
+        self.assertEqual(response.status_code, 200)
+
+
+class HashRingTests(SimpleTestCase):
+    hosts = ['redis-a:6379', 'redis-b:6379', 'redis-c:6379']
+    keys = [f'chat_{i}_{i * 7919}' for i in range(6000)]
+
+    def placement(self, hosts):
+        ring = HashRing(hosts)
+        return {key: hosts[ring.get(key)] for key in self.keys}
+
+    def test_placement_is_stable_and_order_independent(self):
+        placement = self.placement(self.hosts)
+        self.assertEqual(placement, self.placement(self.hosts))
+        self.assertEqual(placement, self.placement(list(reversed(self.hosts))))
+        ring = HashRing(self.hosts)
+        self.assertEqual(ring.get('chat_1_7919'), ring.get(b'chat_1_7919'))
+
+    def test_keys_are_spread_evenly(self):
+        counts = Counter(self.placement(self.hosts).values())
+        self.assertEqual(set(counts), set(self.hosts))
+        for count in counts.values():
+            self.assertAlmostEqual(count / len(self.keys), 1 / 3, delta=0.06)
+
+    def test_adding_a_host_moves_about_1_in_n_keys(self):
+        before = self.placement(self.hosts)
+        after = self.placement([*self.hosts, 'redis-d:6379'])
+        moved = [key for key in self.keys if before[key] != after[key]]
+        self.assertAlmostEqual(len(moved) / len(self.keys), 1 / 4, delta=0.06)
+        # Only to the new host, never between the old ones
+        self.assertEqual({after[key] for key in moved}, {'redis-d:6379'})
+
+    def test_removing_a_host_only_moves_its_keys(self):
+        before = self.placement(self.hosts)
+        after = self.placement(self.hosts[:2])
+        self.assertEqual(
+            {key for key in self.keys if before[key] != after[key]},
+            {key for key in self.keys if before[key] == 'redis-c:6379'},
+        )
+
+    def test_shard_name(self):
+        self.assertEqual(shard_name({'address': 'redis://:secret@redis-a:6380/2'}), 'redis-a:6380/2')
+        self.assertEqual(shard_name({'address': 'redis://redis-a'}), 'redis-a:6379')
+        self.assertEqual(shard_name({'sentinels': [], 'master_name': 'main'}), 'sentinel:main')
+        self.assertEqual(shard_name({'host': 'redis-b'}), 'redis-b:6379')
+
+
+class ShardedRedisChannelLayerTests(SimpleTestCase):
+    """Which shard each call goes to, seen from the connections asked for; no Redis needed."""
+    hosts = ['redis://redis-a:6379', 'redis://redis-b:6379', 'redis://redis-c:6379']
+
+    class Reached(Exception):
+        pass
+
+    def shard_used(self, layer, call):
+        used = []
+
+        def connection(index):
+            used.append(index)
+            raise self.Reached
+
+        async def run():
+            await call()
+
+        with mock.patch.object(layer, 'connection', connection), self.assertRaises(self.Reached):
+            async_to_sync(run)()
+        return used[0]
+
+    def send_and_receive_shards(self, layer_class):
+        pairs = []
+        for _ in range(30):
+            layer = layer_class(hosts=self.hosts)
+            channel = async_to_sync(layer.new_channel)()
+            pairs.append((
+                self.shard_used(layer, lambda: layer.send(channel, {'type': 'test'})),
+                self.shard_used(layer, lambda: layer.receive(channel)),
+            ))
+        return pairs
+
+    def test_process_specific_channels_send_to_the_shard_receive_reads(self):
+        pairs = self.send_and_receive_shards(ShardedRedisChannelLayer)
+        self.assertEqual([send for send, _ in pairs], [receive for _, receive in pairs])
+        # Processes are spread over the shards
+        self.assertGreater(len({receive for _, receive in pairs}), 1)
+
+    def test_channels_redis_alone_does_not(self):
+        # What the override is for
+        pairs = self.send_and_receive_shards(RedisChannelLayer)
+        self.assertNotEqual([send for send, _ in pairs], [receive for _, receive in pairs])
+
+    def test_groups_follow_the_ring(self):
+        layer = ShardedRedisChannelLayer(hosts=self.hosts)
+        for group in ('chat_a_b', 'course_1', 'teacher_registrations_2'):
+            expected = layer.ring.get(group)
+            self.assertEqual(self.shard_used(layer, lambda: layer.group_add(group, 'specific.x!y')), expected)
+            self.assertEqual(self.shard_used(layer, lambda: layer.group_send(group, {'type': 'test'})), expected)
+
+
+class MetricsViewTests(SimpleTestCase):
+
+    def scrape(self, authorization=None):
+        headers = {'HTTP_AUTHORIZATION': authorization} if authorization else {}
+        return metrics_view(RequestFactory().get('/metrics', **headers)).status_code
+
+    @override_settings(METRICS_TOKEN='s3cret')
+    def test_token(self):
+        self.assertEqual(self.scrape('Bearer s3cret'), 200)
+        for authorization in (None, 'Bearer wrong', 'Bearer s3cret ', 's3cret', 'Bearer sécret'):
+            with self.subTest(authorization=authorization):
+                self.assertEqual(self.scrape(authorization), 403)
+
+    @override_settings(METRICS_TOKEN=None, DEBUG=False)
+    def test_no_token_in_production(self):
+        self.assertEqual(self.scrape(), 403)
+
+    @override_settings(METRICS_TOKEN='', DEBUG=True)
+    def test_no_token_in_debug(self):
+        self.assertEqual(self.scrape(), 200)
@@ -16,6 +16,7 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
+from backendtutorhub.metrics import metrics_view
 # from rest_framework_simplejwt import (
 #     TokenObtainPairView,
 #     TokenRefreshView,
@@ -23,9 +24,12 @@ from django.urls import path, include
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
 
     path('api/users/', include('users_service.urls')),
     path('api/', include('course_service.urls')),
+    path('api/sync/', include('sync_service.urls')),
+    path('api/messages/', include('message_service.urls')),
     # path('api/auth/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     # path('api/auth/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
 
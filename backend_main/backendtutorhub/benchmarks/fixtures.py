@@ -0,0 +1,109 @@
+"""
+Synthetic data for the benchmarks.
+
+Everything is inserted with bulk_create in batches and generated from a
+seeded random.Random, so two runs with the same scale produce the same
+shape of data (the UUIDs differ, the distribution doesn't).
+"""
+import random
+import uuid
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from course_service.models import Course, CourseRegistration
+from message_service.models import Message
+from users_service.models import User, UserRole
+
+BENCH_PASSWORD = 'bench-password-1234'
+USERNAME_PREFIX = 'bench_user_'
+TEACHER_RATIO = 0.05
+
+
+def _batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _bulk_insert(model, rows, batch_size):
+    for batch in _batched(rows, batch_size):
+        with transaction.atomic():
+            model.objects.bulk_create(batch, batch_size=batch_size)
+
+
+def generate_dataset(users=1000, courses=100, registrations=10000, messages=10000,
+                     batch_size=5000, seed=42, log=None):
+    """
+    Create `users` users (TEACHER_RATIO of them teachers), `courses` courses
+    spread over the teachers, about `registrations` registrations and
+    `messages` chat messages between random pairs of users.
+
+    All users share BENCH_PASSWORD; the hash is computed once, hashing it per
+    user would take longer than the rest of the seeding.
+    """
+    log = log or (lambda msg: None)
+    rng = random.Random(seed)
+    password = make_password(BENCH_PASSWORD)
+
+    teacher_count = max(1, int(users * TEACHER_RATIO))
+    user_ids = [uuid.UUID(int=rng.getrandbits(128), version=4) for _ in range(users)]
+    teacher_ids = user_ids[:teacher_count]
+    student_ids = user_ids[teacher_count:] or user_ids
+
+    log(f'users: {users} ({teacher_count} teachers)')
+    _bulk_insert(User, (
+        User(
+            id=user_id,
+            username=f'{USERNAME_PREFIX}{i}',
+            email=f'{USERNAME_PREFIX}{i}@example.com',
+            password=password,
+            role=UserRole.TEACHER if i < teacher_count else UserRole.STUDENT,
+        )
+        for i, user_id in enumerate(user_ids)
+    ), batch_size)
+
+    course_ids = [uuid.UUID(int=rng.getrandbits(128), version=4) for _ in range(courses)]
+    log(f'courses: {courses}')
+    _bulk_insert(Course, (
+        Course(
+            id=course_id,
+            title=f'Course {i}',
+            description=f'Description of course {i}. ' * 5,
+            linktoplaylist=f'https://example.com/playlist/{i}',
+            teacher_id=rng.choice(teacher_ids),
+        )
+        for i, course_id in enumerate(course_ids)
+    ), batch_size)
+
+    def registration_rows():
+        if not course_ids:
+            return
+        # Each student takes a distinct sample of courses, which keeps the
+        # (student, course) pairs unique without tracking them all.
+        per_student = registrations / len(student_ids)
+        remaining = registrations
+        for student_id in student_ids:
+            if remaining <= 0:
+                break
+            count = int(per_student) + (rng.random() < per_student % 1)
+            count = min(count, len(course_ids), remaining)
+            remaining -= count
+            for course_id in rng.sample(course_ids, count):
+                yield CourseRegistration(student_id=student_id, course_id=course_id)
+
+    log(f'registrations: ~{registrations}')
+    _bulk_insert(CourseRegistration, registration_rows(), batch_size)
+
+    def message_rows():
+        for i in range(messages):
+            sender, receiver = rng.sample(user_ids, 2) if len(user_ids) > 1 else (user_ids[0], user_ids[0])
+            yield Message(sender_id=sender, receiver_id=receiver, content=f'Benchmark message {i}')
+
+    log(f'messages: {messages}')
+    _bulk_insert(Message, message_rows(), batch_size)
@@ -0,0 +1,84 @@
+import json
+import platform
+import time
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from benchmarks.runner import (
+    SCENARIOS,
+    BenchmarkContext,
+    add_dataset_arguments,
+    compare,
+    make_requester,
+    run_scenario,
+    seeded_database,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway test database and time the main API endpoints. "
+        "Use --save-baseline to record results and --compare to fail on regressions."
+    )
+
+    def add_arguments(self, parser):
+        add_dataset_arguments(parser)
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--scenario', action='append', choices=sorted(SCENARIOS),
+            help="Scenario to run, can be repeated (default: all).",
+        )
+        parser.add_argument('--client', choices=['sync', 'asgi'], default='sync',
+                            help="Test client (WSGI style) or AsyncClient (ASGI handler).")
+        parser.add_argument('--save-baseline', metavar='PATH')
+        parser.add_argument('--compare', metavar='PATH', help="Baseline JSON to compare against.")
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help="Allowed latency/memory growth over the baseline (default 0.2 = 20%%).")
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)
+
+        with seeded_database(options, self.stdout.write):
+            ctx = BenchmarkContext()
+            request = make_requester(options['client'])
+            results = {}
+            for name in options['scenario'] or list(SCENARIOS):
+                results[name] = run_scenario(
+                    name, ctx, request, iterations=options['iterations'], warmup=options['warmup'],
+                )
+                r = results[name]
+                self.stdout.write(
+                    f"{name:<20} p50 {r['p50_ms']:>9.2f}ms  p95 {r['p95_ms']:>9.2f}ms  "
+                    f"queries {r['queries']:>3}  peak {r['peak_memory_kb']:>9.1f}KB  "
+                    f"{r['response_bytes']} bytes"
+                )
+
+        report = {
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'client': options['client'],
+            'scale': {key: options[key] for key in ('users', 'courses', 'registrations', 'messages')},
+            'scenarios': results,
+        }
+        if options['save_baseline']:
+            with open(options['save_baseline'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Baseline written to {options['save_baseline']}")
+
+        if baseline is not None:
+            if baseline.get('scale') != report['scale']:
+                self.stderr.write('Warning: baseline was recorded at a different scale')
+            if baseline.get('client') != report['client']:
+                self.stderr.write(f"Warning: baseline was recorded with the {baseline.get('client')} client")
+            regressions = compare(results, baseline, options['threshold'])
+            if regressions:
+                raise CommandError('Performance regressions:\n  ' + '\n  '.join(regressions))
+            self.stdout.write(self.style.SUCCESS('No regressions against the baseline'))
@@ -0,0 +1,76 @@
+import asyncio
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient
+
+from benchmarks.runner import BenchmarkContext, add_dataset_arguments, seeded_database
+
+# name -> (sync path, async path, needs auth); {course} is filled per request
+PAIRS = {
+    'course_public_list': ('/api/courses/public/', '/api/async/courses/public/', False),
+    'course_detail': ('/api/courses/{course}/', '/api/async/courses/{course}/', False),
+    'registrations': ('/api/registrations/', '/api/async/registrations/', True),
+    'user_public_list': ('/api/users/users/public/', '/api/users/async/users/public/', False),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare requests/sec of the sync DRF read views and their async "
+        "counterparts under concurrent load, both through the ASGI handler "
+        "in this one process (i.e. the same worker count)."
+    )
+
+    def add_arguments(self, parser):
+        add_dataset_arguments(parser)
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--requests', type=int, default=500, help="Requests per endpoint and variant.")
+        parser.add_argument('--endpoint', action='append', choices=sorted(PAIRS))
+
+    def handle(self, *args, **options):
+        with seeded_database(options, self.stdout.write):
+            ctx = BenchmarkContext()
+            for name in options['endpoint'] or list(PAIRS):
+                sync_path, async_path, auth = PAIRS[name]
+                headers = {'Authorization': ctx.auth_header} if auth else {}
+                self.check_same_response(name, sync_path, async_path, ctx, headers)
+                results = {}
+                for variant, path in (('sync', sync_path), ('async', async_path)):
+                    results[variant] = asyncio.run(self.load(
+                        path, ctx, headers, options['concurrency'], options['requests'],
+                    ))
+                speedup = results['async'] / results['sync'] if results['sync'] else 0
+                self.stdout.write(
+                    f"{name:<20} sync {results['sync']:>8.1f} req/s  "
+                    f"async {results['async']:>8.1f} req/s  ({speedup:.2f}x)"
+                )
+
+    async def load(self, path, ctx, headers, concurrency, total):
+        remaining = total
+
+        async def worker():
+            nonlocal remaining
+            client = AsyncClient()
+            while remaining > 0:
+                remaining -= 1
+                response = await client.get(path.format(course=ctx.course_id()), headers=headers)
+                if response.status_code >= 400:
+                    raise RuntimeError(f'{path} returned {response.status_code}')
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return total / (time.perf_counter() - start)
+
+    def check_same_response(self, name, sync_path, async_path, ctx, headers):
+        async def fetch():
+            client = AsyncClient()
+            course = ctx.course_id()
+            sync_response = await client.get(sync_path.format(course=course), headers=headers)
+            async_response = await client.get(async_path.format(course=course), headers=headers)
+            return sync_response, async_response
+
+        sync_response, async_response = asyncio.run(fetch())
+        if json.loads(sync_response.content) != json.loads(async_response.content):
+            self.stderr.write(f'Warning: {name} sync and async responses differ')
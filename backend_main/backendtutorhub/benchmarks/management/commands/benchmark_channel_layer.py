@@ -0,0 +1,105 @@
+import asyncio
+import multiprocessing
+import random
+import time
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from backendtutorhub.channel_layers import ShardedRedisChannelLayer
+
+
+async def _worker(hosts, options, barrier, results):
+    layer = ShardedRedisChannelLayer(hosts=hosts, capacity=1000)
+    prefix = f'bench_{multiprocessing.current_process().pid}'
+    groups = [f'{prefix}_{g}' for g in range(options['groups'])]
+    received = 0
+
+    # Groups of `members` channels each, like chat_<a>_<b> pairs
+    members = {}
+    for group in groups:
+        members[group] = [await layer.new_channel() for _ in range(options['members'])]
+        for channel in members[group]:
+            await layer.group_add(group, channel)
+
+    async def receive(channel):
+        nonlocal received
+        while True:
+            await layer.receive(channel)
+            received += 1
+
+    receivers = [asyncio.ensure_future(receive(c)) for channels in members.values() for c in channels]
+
+    barrier.wait()
+    deadline = time.perf_counter() + options['duration']
+    sent = 0
+
+    async def send():
+        nonlocal sent
+        rng = random.Random()
+        while time.perf_counter() < deadline:
+            await layer.group_send(rng.choice(groups), {'type': 'chat.message', 'message': 'x' * options['size']})
+            sent += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(send() for _ in range(options['concurrency'])))
+    elapsed = time.perf_counter() - start
+    # Let the receivers drain what's in flight
+    await asyncio.sleep(0.5)
+    for task in receivers:
+        task.cancel()
+    await asyncio.gather(*receivers, return_exceptions=True)
+    results.put((sent, received, elapsed))
+
+
+def _run_worker(hosts, options, barrier, results):
+    asyncio.run(_worker(hosts, options, barrier, results))
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure group_send throughput of ShardedRedisChannelLayer from several "
+        "processes with 1, 2, ... N Redis shards. Start the Redis servers first, "
+        "e.g. redis-server --port 6380 --save '' & (and 6381, 6382, ...). "
+        "Everything under the layer's prefix is flushed on those servers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hosts', help='Comma separated redis:// URLs (default: CHANNEL_REDIS_URLS)')
+        parser.add_argument('--processes', type=int, default=4)
+        parser.add_argument('--groups', type=int, default=100, help='Groups per process')
+        parser.add_argument('--members', type=int, default=2, help='Channels per group')
+        parser.add_argument('--concurrency', type=int, default=20, help='Concurrent senders per process')
+        parser.add_argument('--duration', type=float, default=5.0, help='Seconds per shard count')
+        parser.add_argument('--size', type=int, default=200, help='Message payload bytes')
+
+    def handle(self, *args, **options):
+        hosts = [h.strip() for h in (options['hosts'] or '').split(',') if h.strip()] or settings.CHANNEL_REDIS_URLS
+        if not hosts:
+            raise CommandError('Pass --hosts or set CHANNEL_REDIS_URLS')
+
+        baseline = None
+        context = multiprocessing.get_context('spawn')
+        for shards in range(1, len(hosts) + 1):
+            async_to_sync(ShardedRedisChannelLayer(hosts=hosts[:shards]).flush)()
+            barrier = context.Barrier(options['processes'])
+            results = context.Queue()
+            workers = [
+                context.Process(target=_run_worker, args=(hosts[:shards], options, barrier, results))
+                for _ in range(options['processes'])
+            ]
+            for worker in workers:
+                worker.start()
+            totals = [results.get() for _ in workers]
+            for worker in workers:
+                worker.join()
+
+            elapsed = max(t[2] for t in totals)
+            sends = sum(t[0] for t in totals) / elapsed
+            deliveries = sum(t[1] for t in totals) / elapsed
+            baseline = baseline or sends
+            self.stdout.write(
+                f'{shards} shard(s): {sends:>10.0f} group_send/s  {deliveries:>10.0f} deliveries/s  '
+                f'x{sends / baseline:.2f}'
+            )
@@ -0,0 +1,65 @@
+import gzip
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from backendtutorhub import compression, renderers
+from benchmarks.runner import add_dataset_arguments, seeded_database
+from course_service.models import Course
+from course_service.serializers import CourseSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Time serialize + render + compress of the public course list with the "
+        "stdlib and orjson renderers and gzip/brotli, and report bytes on the wire."
+    )
+
+    def add_arguments(self, parser):
+        add_dataset_arguments(parser)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with seeded_database(options, self.stdout.write):
+            courses = list(Course.objects.all())
+
+        repeat = options['repeat']
+        start = time.perf_counter()
+        for _ in range(repeat):
+            data = CourseSerializer(courses, many=True).data
+        serialize_ms = (time.perf_counter() - start) / repeat * 1000
+        self.stdout.write(f'{len(courses)} courses, serializer: {serialize_ms:.2f}ms')
+
+        renderer_variants = [('json', JSONRenderer().render)]
+        if renderers.orjson is not None:
+            renderer_variants.append(('orjson', renderers.dumps))
+        else:
+            self.stderr.write('orjson is not installed, skipping it')
+
+        compressors = [
+            ('identity', lambda body: body),
+            ('gzip', lambda body: gzip.compress(body, compresslevel=6)),
+        ]
+        if compression.brotli is not None:
+            quality = compression.CompressionMiddleware(lambda request: None).brotli_quality
+            compressors.append((f'br q{quality}', lambda body: compression.brotli.compress(body, quality=quality)))
+        else:
+            self.stderr.write('Brotli is not installed, skipping it')
+
+        for renderer_name, render in renderer_variants:
+            start = time.perf_counter()
+            for _ in range(repeat):
+                body = render(data)
+            render_ms = (time.perf_counter() - start) / repeat * 1000
+
+            for compressor_name, compress in compressors:
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    wire = compress(body)
+                compress_ms = (time.perf_counter() - start) / repeat * 1000
+                self.stdout.write(
+                    f'{renderer_name:<7} {compressor_name:<9} render {render_ms:>8.2f}ms  '
+                    f'compress {compress_ms:>8.2f}ms  total {serialize_ms + render_ms + compress_ms:>8.2f}ms  '
+                    f'{len(wire):>10} bytes'
+                )
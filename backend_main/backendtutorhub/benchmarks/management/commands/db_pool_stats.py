@@ -0,0 +1,68 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from backendtutorhub.metrics import db_pool_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a query from --threads threads at once, each taking a connection "
+        "the way a request does and giving it back afterwards, then print the "
+        "connection pool stats (in use, waiting, wait time, errors)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--threads', type=int, default=20)
+        parser.add_argument('--requests', type=int, default=50, help='Requests per thread')
+        parser.add_argument('--sleep', type=float, default=0.01, help='Seconds a request holds its connection')
+
+    def handle(self, *args, **options):
+        alias = options['database']
+        if not settings.DATABASES[alias].get('OPTIONS', {}).get('pool'):
+            raise CommandError(f"Database {alias!r} isn't pooled, set DATABASE_POOL=1 (PostgreSQL only)")
+
+        errors = []
+
+        def worker():
+            connection = connections[alias]
+            for _ in range(options['requests']):
+                try:
+                    with connection.cursor() as cursor:
+                        cursor.execute('SELECT pg_sleep(%s)', [options['sleep']])
+                except Exception as exc:
+                    errors.append(exc)
+                finally:
+                    # Back to the pool, like at the end of a request
+                    connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(options['threads'])]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        total = options['threads'] * options['requests']
+        self.stdout.write(f'{total} requests from {len(threads)} threads in {elapsed:.2f}s, {len(errors)} errors')
+        if errors:
+            self.stdout.write(f'first error: {errors[0]!r}')
+
+        stats = db_pool_stats().get(alias, {})
+        requests_num = stats.get('requests_num', 0)
+        self.stdout.write(
+            f"pool size {stats.get('pool_size', 0)}/{stats.get('pool_max', 0)}, "
+            f"available {stats.get('pool_available', 0)}, waiting {stats.get('requests_waiting', 0)}"
+        )
+        self.stdout.write(
+            f"requests {requests_num}, queued {stats.get('requests_queued', 0)}, "
+            f"timed out {stats.get('requests_errors', 0)}, "
+            f"mean wait {stats.get('requests_wait_ms', 0) / max(requests_num, 1):.2f}ms"
+        )
+        for key, value in sorted(stats.items()):
+            self.stdout.write(f'  {key}: {value}')
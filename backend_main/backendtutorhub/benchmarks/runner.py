@@ -0,0 +1,194 @@
+"""
+Times the API endpoints in-process, through the Django test client (WSGI
+style) or the AsyncClient (ASGI handler, the path Daphne uses).
+
+Each scenario is measured for latency (p50/p95/mean), number of queries per
+request and peak Python memory allocated while handling one request.
+"""
+import contextlib
+import itertools
+import math
+import time
+import tracemalloc
+
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from course_service.models import Course, CourseRegistration
+from users_service.models import User
+
+from .fixtures import BENCH_PASSWORD, USERNAME_PREFIX, generate_dataset
+
+
+def add_dataset_arguments(parser):
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--courses', type=int, default=100)
+    parser.add_argument('--registrations', type=int, default=10000)
+    parser.add_argument('--messages', type=int, default=10000)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--keepdb', action='store_true',
+                        help="Keep the test database (and its data) between runs.")
+
+
+@contextlib.contextmanager
+def seeded_database(options, log):
+    """
+    Create the test database, seed it unless it already holds benchmark data
+    (--keepdb) and drop it again on exit.
+    """
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, keepdb=options['keepdb'], serialize=False,
+    )
+    try:
+        if not User.objects.filter(username__startswith=USERNAME_PREFIX).exists():
+            start = time.perf_counter()
+            generate_dataset(
+                users=options['users'],
+                courses=options['courses'],
+                registrations=options['registrations'],
+                messages=options['messages'],
+                batch_size=options['batch_size'],
+                seed=options['seed'],
+                log=lambda msg: log(f'  seeding {msg}'),
+            )
+            log(f'Seeded in {time.perf_counter() - start:.1f}s')
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+
+
+class BenchmarkContext:
+    """Objects the scenarios need, picked once from the seeded data."""
+
+    def __init__(self):
+        self.course_ids = [str(pk) for pk in Course.objects.values_list('pk', flat=True)[:100]]
+        registration = CourseRegistration.objects.select_related('student').first()
+        self.student = registration.student if registration else User.objects.filter(
+            username__startswith=USERNAME_PREFIX).first()
+        self.auth_header = f'Bearer {RefreshToken.for_user(self.student).access_token}'
+        self._counter = itertools.count()
+        self._run = int(time.time())
+
+    def next_index(self):
+        return next(self._counter)
+
+    def course_id(self):
+        return self.course_ids[self.next_index() % len(self.course_ids)]
+
+    def signup_username(self):
+        return f'bench_signup_{self._run}_{self.next_index()}'
+
+
+# name -> function(ctx) returning (method, path, kwargs for the client call)
+SCENARIOS = {
+    'course_public_list': lambda ctx: ('get', '/api/courses/public/', {}),
+    'course_detail': lambda ctx: ('get', f'/api/courses/{ctx.course_id()}/', {}),
+    'registrations': lambda ctx: ('get', '/api/registrations/', {'HTTP_AUTHORIZATION': ctx.auth_header}),
+    'user_public_list': lambda ctx: ('get', '/api/users/users/public/', {}),
+    'signup': lambda ctx: ('post', '/api/users/signup/', {
+        'data': {
+            'username': ctx.signup_username(),
+            'password': BENCH_PASSWORD,
+            'email': 'signup@example.com',
+            'role': 'student',
+        },
+        'content_type': 'application/json',
+    }),
+    'token': lambda ctx: ('post', '/api/users/token/', {
+        'data': {'username': ctx.student.username, 'password': BENCH_PASSWORD},
+        'content_type': 'application/json',
+    }),
+}
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an unsorted list."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct * len(ordered) / 100) - 1))
+    return ordered[index]
+
+
+def make_requester(client_kind):
+    if client_kind == 'asgi':
+        client = AsyncClient()
+
+        def request(method, path, kwargs):
+            kwargs = dict(kwargs)
+            # AsyncClient takes headers as a dict rather than WSGI-style kwargs
+            if 'HTTP_AUTHORIZATION' in kwargs:
+                kwargs['headers'] = {'Authorization': kwargs.pop('HTTP_AUTHORIZATION')}
+            return async_to_sync(getattr(client, method))(path, **kwargs)
+    else:
+        client = Client()
+
+        def request(method, path, kwargs):
+            return getattr(client, method)(path, **kwargs)
+    return request
+
+
+def run_scenario(name, ctx, request, iterations=50, warmup=5):
+    build = SCENARIOS[name]
+
+    def call():
+        method, path, kwargs = build(ctx)
+        response = request(method, path, kwargs)
+        if response.status_code >= 400:
+            raise RuntimeError(f'{name}: {method.upper()} {path} returned {response.status_code}')
+        return response
+
+    for _ in range(warmup):
+        call()
+
+    latencies = []
+    queries = []
+    size = 0
+    for _ in range(iterations):
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = call()
+            latencies.append(time.perf_counter() - start)
+        queries.append(len(captured))
+        size = len(response.content)
+
+    # Separate pass: tracemalloc slows everything down too much to time with it on
+    tracemalloc.start()
+    try:
+        call()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'iterations': iterations,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3),
+        'queries': max(queries),
+        'peak_memory_kb': round(peak / 1024, 1),
+        'response_bytes': size,
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Return a list of human readable regressions of `results` against a saved
+    baseline. Latency and memory may grow by `threshold` (0.2 = 20%), the
+    number of queries may not grow at all.
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if previous is None:
+            continue
+        for key in ('p95_ms', 'peak_memory_kb'):
+            limit = previous[key] * (1 + threshold)
+            if current[key] > limit:
+                regressions.append(f'{name}: {key} {current[key]} > {previous[key]} (+{threshold:.0%} allowed)')
+        if current['queries'] > previous['queries']:
+            regressions.append(f'{name}: queries {current["queries"]} > {previous["queries"]}')
+    return regressions
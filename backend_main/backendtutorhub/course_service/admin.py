@@ -1,5 +1,32 @@
 from django.contrib import admin
+from backendtutorhub.admin_tools import LargeTableAdmin
 from .models import Course, CourseRegistration
 # Register your models here.
-admin.site.register(CourseRegistration)
-admin.site.register(Course)
+
+
+@admin.register(Course)
+class CourseAdmin(LargeTableAdmin):
+    list_display = ['title', 'teacher', 'created_at']
+    list_select_related = ['teacher']
+    raw_id_fields = ['teacher']
+    # title is matched as a substring, teacher only exactly and case-sensitively
+    # so the lookup can use the unique index on username (the '=' prefix would
+    # be iexact, i.e. UPPER(username) = UPPER(...), which can't)
+    search_fields = ['title', 'teacher__username__exact']
+    date_hierarchy = 'created_at'
+    ordering = ['-created_at']
+    list_filter = ['created_at']
+
+
+@admin.register(CourseRegistration)
+class CourseRegistrationAdmin(LargeTableAdmin):
+    list_display = ['id', 'student', 'course', 'registered_at']
+    list_select_related = ['student', 'course']
+    raw_id_fields = ['student']
+    autocomplete_fields = ['course']
+    search_fields = ['student__username__exact']
+    ordering = ['-registered_at']
+    # No date_hierarchy: its year/month links come from a SELECT DISTINCT over
+    # the truncated dates of the whole table. The date filter's ranges use
+    # the index on registered_at.
+    list_filter = ['registered_at']
@@ -0,0 +1,97 @@
+"""
+Course-wide announcements from a teacher to the registered students.
+
+Everyone connected to ws/courses/ joins the group course_<id> of each course
+they're registered for (teachers: each course they teach). An announcement
+is then one INSERT and one group_send, however many students the course
+has. Students who weren't connected see it through the REST list and the
+unread counts sent when they connect.
+
+Each socket also joins course_member_<user id>. When a registration is
+deleted, a course.left event on that group takes the student's open
+sockets out of the course's group, so they stop getting its
+announcements.
+"""
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import router, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.utils import timezone
+
+from backendtutorhub.metrics import CHANNEL_LAYER_DURATION
+from .models import CourseAnnouncement, CourseRegistration, CourseReadState
+
+logger = logging.getLogger(__name__)
+
+
+def course_group_name(course_id):
+    return f'course_{course_id}'
+
+
+def member_group_name(user_id):
+    return f'course_member_{user_id}'
+
+
+def left_course(student_id, course_id):
+    """Take the student's open sockets out of the course's group."""
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    try:
+        with CHANNEL_LAYER_DURATION.labels('group_send').time():
+            async_to_sync(channel_layer.group_send)(
+                member_group_name(student_id),
+                {'type': 'course.left', 'course': str(course_id)},
+            )
+    except Exception:
+        # Their sockets keep getting the course's announcements until
+        # they reconnect
+        logger.exception("Could not remove student %s from course %s", student_id, course_id)
+
+
+def publish(announcement):
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    try:
+        with CHANNEL_LAYER_DURATION.labels('group_send').time():
+            async_to_sync(channel_layer.group_send)(
+                course_group_name(announcement.course_id),
+                {'type': 'course.announcement', 'announcement': announcement.to_dict()},
+            )
+    except Exception:
+        # It's stored; clients that missed the push get it from the REST list
+        logger.exception("Could not publish announcement %s", announcement.pk)
+
+
+def announce(course, author, content):
+    """Store the announcement and publish it once the transaction commits."""
+    announcement = CourseAnnouncement.objects.create(course=course, author=author, content=content)
+    transaction.on_commit(lambda: publish(announcement), using=router.db_for_write(CourseAnnouncement))
+    return announcement
+
+
+def mark_read(student, course_id, until=None):
+    """Everything in the course up to `until` (default now) counts as read."""
+    CourseReadState.objects.update_or_create(
+        student=student,
+        course_id=course_id,
+        defaults={'last_read_at': until or timezone.now()},
+    )
+
+
+def unread_counts(student):
+    """{course_id: number of unread announcements} over the student's registrations."""
+    last_read = CourseReadState.objects.filter(student=student, course=OuterRef('course')).values('last_read_at')[:1]
+    rows = (
+        CourseAnnouncement.objects
+        .filter(course__in=CourseRegistration.objects.filter(student=student).values('course'))
+        .annotate(last_read=Subquery(last_read))
+        .filter(Q(last_read__isnull=True) | Q(created_at__gt=F('last_read')))
+        .values('course')
+        .annotate(unread=Count('pk'))
+        .order_by()
+    )
+    return {row['course']: row['unread'] for row in rows}
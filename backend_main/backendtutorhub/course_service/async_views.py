@@ -0,0 +1,35 @@
+"""
+Async versions of the read-only course endpoints. They return the same data
+as their sync counterparts in views.py but run on the event loop under
+Daphne instead of in the sync_to_async thread pool.
+"""
+from rest_framework.permissions import AllowAny, IsAuthenticated
+
+from backendtutorhub.async_api import AsyncListAPIView, AsyncRetrieveAPIView
+from .models import Course, CourseRegistration
+from .serializers import CourseSerializer, CourseRegistrationSerializer
+
+
+class AsyncCoursePublicListView(AsyncListAPIView):
+    """Async CoursePublicListView."""
+    queryset = Course.objects.all()
+    serializer_class = CourseSerializer
+    permission_classes = [AllowAny]
+    filterset_fields = {'teacher': ['exact'], 'teacher__username': ['exact']}
+
+
+class AsyncCourseDetailView(AsyncRetrieveAPIView):
+    """Async CourseDetailView (GET only; updates stay on the sync view)."""
+    queryset = Course.objects.all()
+    serializer_class = CourseSerializer
+    permission_classes = [AllowAny]
+
+
+class AsyncCourseRegistrationListView(AsyncListAPIView):
+    """Async CourseRegistrationView (list only)."""
+    serializer_class = CourseRegistrationSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        # only registrations for the logged-in student
+        return CourseRegistration.objects.filter(student=self.request.user)
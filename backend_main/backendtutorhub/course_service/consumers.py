@@ -0,0 +1,130 @@
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.generic.websocket import JsonWebsocketConsumer
+
+from backendtutorhub.metrics import CHANNEL_LAYER_DURATION, WEBSOCKET_CONNECTIONS
+from backendtutorhub.profiling import ProfilingConsumerMixin
+from users_service.models import UserRole
+from . import announcements
+from .announcements import course_group_name, member_group_name
+from .events import teacher_group_name
+from .models import Course, CourseRegistration
+
+logger = logging.getLogger(__name__)
+
+
+class TeacherRegistrationConsumer(ProfilingConsumerMixin, JsonWebsocketConsumer):
+    """
+    Pushes registration changes on the connected teacher's courses, see
+    course_service.events for the event format. Read-only: anything the
+    client sends is ignored.
+    """
+
+    def connect(self):
+        user = self.scope['user']
+        if not user.is_authenticated or user.role != UserRole.TEACHER:
+            logger.info("Registration feed rejected for %s", user)
+            self.close()
+            return
+
+        self.group_name = teacher_group_name(user.pk)
+        with CHANNEL_LAYER_DURATION.labels('group_add').time():
+            async_to_sync(self.channel_layer.group_add)(self.group_name, self.channel_name)
+        self.accept()
+        WEBSOCKET_CONNECTIONS.labels(type(self).__name__).inc()
+        self.connection_counted = True
+
+    def disconnect(self, close_code):
+        # Only if connect() got that far, group_add may have failed
+        if getattr(self, 'connection_counted', False):
+            WEBSOCKET_CONNECTIONS.labels(type(self).__name__).dec()
+        if hasattr(self, 'group_name'):
+            with CHANNEL_LAYER_DURATION.labels('group_discard').time():
+                async_to_sync(self.channel_layer.group_discard)(self.group_name, self.channel_name)
+
+    def receive_json(self, content):
+        pass
+
+    def registrations_changed(self, event):
+        self.send_json({'type': 'registrations_changed', 'courses': event['courses']})
+
+
+class CourseChannelConsumer(ProfilingConsumerMixin, JsonWebsocketConsumer):
+    """
+    Course announcements. On connect the user joins the group of every
+    course they're registered for or teach, and students get their unread
+    counts. Courses registered for after connecting are joined on the next
+    connect; unregistering leaves the course's group right away.
+
+    Client messages:
+        {"type": "announce", "course": "<id>", "message": "..."}  teacher of the course
+        {"type": "read", "course": "<id>"}                        mark announcements read
+    """
+
+    def connect(self):
+        user = self.scope['user']
+        if not user.is_authenticated:
+            self.close()
+            return
+        self.user = user
+
+        if user.role == UserRole.TEACHER:
+            course_ids = Course.objects.filter(teacher=user).values_list('pk', flat=True)
+        else:
+            course_ids = CourseRegistration.objects.filter(student=user).values_list('course_id', flat=True)
+        self.course_ids = {str(pk) for pk in course_ids}
+        self.member_group = member_group_name(user.pk)
+
+        with CHANNEL_LAYER_DURATION.labels('group_add').time():
+            async_to_sync(self.channel_layer.group_add)(self.member_group, self.channel_name)
+            for course_id in self.course_ids:
+                async_to_sync(self.channel_layer.group_add)(course_group_name(course_id), self.channel_name)
+        self.accept()
+        WEBSOCKET_CONNECTIONS.labels(type(self).__name__).inc()
+        self.connection_counted = True
+
+        if user.role != UserRole.TEACHER:
+            self.send_json({
+                'type': 'unread',
+                'courses': {str(pk): count for pk, count in announcements.unread_counts(user).items()},
+            })
+
+    def disconnect(self, close_code):
+        # Only if connect() got that far, group_add may have failed
+        if getattr(self, 'connection_counted', False):
+            WEBSOCKET_CONNECTIONS.labels(type(self).__name__).dec()
+        if hasattr(self, 'course_ids'):
+            with CHANNEL_LAYER_DURATION.labels('group_discard').time():
+                async_to_sync(self.channel_layer.group_discard)(self.member_group, self.channel_name)
+                for course_id in self.course_ids:
+                    async_to_sync(self.channel_layer.group_discard)(course_group_name(course_id), self.channel_name)
+
+    def receive_json(self, content):
+        message_type = content.get('type')
+        course_id = str(content.get('course'))
+        if course_id not in self.course_ids:
+            self.send_json({'type': 'error', 'error': 'Not a member of this course.'})
+            return
+
+        if message_type == 'announce' and content.get('message'):
+            course = Course.objects.filter(pk=course_id, teacher=self.user).first()
+            if course is None:
+                self.send_json({'type': 'error', 'error': 'Only the teacher of the course can announce.'})
+                return
+            announcements.announce(course, self.user, content['message'])
+        elif message_type == 'read':
+            announcements.mark_read(self.user, course_id)
+        else:
+            logger.warning("Received unknown message format: %s", content)
+
+    def course_announcement(self, event):
+        self.send_json({'type': 'announcement', **event['announcement']})
+
+    def course_left(self, event):
+        course_id = event['course']
+        if course_id not in self.course_ids:
+            return
+        self.course_ids.discard(course_id)
+        with CHANNEL_LAYER_DURATION.labels('group_discard').time():
+            async_to_sync(self.channel_layer.group_discard)(course_group_name(course_id), self.channel_name)
@@ -0,0 +1,98 @@
+"""
+Push registration changes to the teacher's websocket instead of making the
+dashboard poll /api/courses/.
+
+Registration creates and deletes are buffered per teacher for
+REGISTRATION_EVENTS_WINDOW seconds and then published as one event to the
+group teacher_registrations_<teacher id>:
+
+    {"type": "registrations.changed",
+     "courses": [{"course": "<uuid>", "added": 3, "removed": 1}, ...]}
+
+A burst of sign-ups for the same course therefore costs one channel layer
+round trip and one websocket frame. Buffering is per process; with several
+workers a teacher can get one event per worker for the same window.
+"""
+import logging
+import threading
+from collections import defaultdict
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+from backendtutorhub.metrics import CHANNEL_LAYER_DURATION
+
+logger = logging.getLogger(__name__)
+
+
+def teacher_group_name(teacher_id):
+    return f'teacher_registrations_{teacher_id}'
+
+
+def publish(teacher_id, changes):
+    """Send the per-course `changes` {course_id: {'added': n, 'removed': n}} right away."""
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    event = {
+        'type': 'registrations.changed',
+        'courses': [
+            {'course': str(course_id), **counts}
+            for course_id, counts in changes.items()
+        ],
+    }
+    try:
+        with CHANNEL_LAYER_DURATION.labels('group_send').time():
+            async_to_sync(channel_layer.group_send)(teacher_group_name(teacher_id), event)
+    except Exception:
+        # The registration is committed already; a lost push only means the
+        # teacher sees it on the next refresh
+        logger.exception("Could not publish registration changes for teacher %s", teacher_id)
+
+
+class RegistrationEventCoalescer:
+
+    def __init__(self, window=None):
+        self.window = window
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._timers = {}
+
+    def get_window(self):
+        if self.window is not None:
+            return self.window
+        return getattr(settings, 'REGISTRATION_EVENTS_WINDOW', 0.5)
+
+    def add(self, teacher_id, course_id, added=0, removed=0):
+        window = self.get_window()
+        if window <= 0:
+            publish(teacher_id, {course_id: {'added': added, 'removed': removed}})
+            return
+        with self._lock:
+            changes = self._pending.setdefault(teacher_id, defaultdict(lambda: {'added': 0, 'removed': 0}))
+            changes[course_id]['added'] += added
+            changes[course_id]['removed'] += removed
+            if teacher_id not in self._timers:
+                timer = threading.Timer(window, self.flush, args=(teacher_id,))
+                timer.daemon = True
+                self._timers[teacher_id] = timer
+                timer.start()
+
+    def flush(self, teacher_id=None):
+        """Publish what's buffered for `teacher_id`, or for every teacher."""
+        with self._lock:
+            teacher_ids = list(self._pending) if teacher_id is None else [teacher_id]
+            batches = []
+            for pk in teacher_ids:
+                timer = self._timers.pop(pk, None)
+                if timer is not None:
+                    timer.cancel()
+                changes = self._pending.pop(pk, None)
+                if changes:
+                    batches.append((pk, dict(changes)))
+        for pk, changes in batches:
+            publish(pk, changes)
+
+
+coalescer = RegistrationEventCoalescer()
@@ -0,0 +1,37 @@
+from collections import defaultdict
+
+from django.core.mail import EmailMessage, get_connection
+
+from jobs_service.queue import job
+from .models import CourseRegistration
+
+
+@job('course_service.notify_teachers_of_registrations', batch=True)
+def notify_teachers_of_registrations(payloads):
+    """
+    One email per teacher listing all the new registrations in the batch,
+    instead of one per registration.
+    """
+    registrations = (
+        CourseRegistration.objects
+        .filter(pk__in=[payload['registration_id'] for payload in payloads])
+        .select_related('student', 'course__teacher')
+        .order_by('registered_at')
+    )
+    by_teacher = defaultdict(list)
+    for registration in registrations:
+        by_teacher[registration.course.teacher].append(registration)
+
+    messages = []
+    for teacher, new_registrations in by_teacher.items():
+        if not teacher.email:
+            continue
+        lines = [f"- {r.student.username} registered for {r.course.title}" for r in new_registrations]
+        messages.append(EmailMessage(
+            f"{len(new_registrations)} new registration(s) for your courses",
+            "\n".join(lines),
+            None,
+            [teacher.email],
+        ))
+    if messages:
+        get_connection().send_messages(messages)
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from course_service import recommendations
+
+
+class Command(BaseCommand):
+    help = (
+        "Compute \"students who took this also took\" for every course whose "
+        "registrations changed since the last run (all courses with --full). "
+        "Meant to run from cron every few minutes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Recompute every course')
+        parser.add_argument('--top-k', type=int, default=10)
+        parser.add_argument('--metric', choices=recommendations.METRICS, default='cosine')
+        parser.add_argument('--min-common', type=int, default=1, help='Minimum number of shared students')
+        parser.add_argument('--batch-size', type=int, default=256, help='Courses per sparse product')
+        parser.add_argument('--chunk-size', type=int, default=10000, help='Registrations fetched per query')
+
+    def handle(self, *args, **options):
+        if recommendations.np is None:
+            raise CommandError('numpy and scipy are required, pip install numpy scipy')
+        recommendations.refresh(
+            k=options['top_k'],
+            metric=options['metric'],
+            min_common=options['min_common'],
+            full=options['full'],
+            batch_size=options['batch_size'],
+            chunk_size=options['chunk_size'],
+            log=self.stdout.write,
+        )
@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-19 16:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course_service', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedCoursesRefresh',
+            fields=[
+                ('course', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='+', serialize=False, to='course_service.course')),
+                ('queued_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RelatedCourse',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('common', models.PositiveIntegerField()),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_courses', to='course_service.course')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='course_service.course')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['course', '-score'], name='related_course_score')],
+                'unique_together': {('course', 'related')},
+            },
+        ),
+    ]
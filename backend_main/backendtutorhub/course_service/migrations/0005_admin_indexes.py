@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-19 16:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course_service', '0004_course_announcements'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['created_at'], name='course_created_at'),
+        ),
+        migrations.AddIndex(
+            model_name='courseregistration',
+            index=models.Index(fields=['registered_at'], name='registration_registered_at'),
+        ),
+    ]
@@ -16,6 +16,11 @@ class Course(models.Model):
         related_name='courses'
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at'], name='course_created_at'),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -36,6 +41,90 @@ class CourseRegistration(models.Model):
 
     class Meta:
         unique_together = ('student', 'course')  # prevent duplicate registrations
+        indexes = [
+            models.Index(fields=['registered_at'], name='registration_registered_at'),
+        ]
 
     def __str__(self):
         return f"{self.student.username} registered for {self.course.title}"
+
+
+class RelatedCourse(models.Model):
+    """
+    "Students who took this also took": the top neighbours of a course by
+    co-registration similarity. Precomputed by `manage.py
+    compute_related_courses`, see course_service.recommendations.
+    """
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='related_courses')
+    related = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    # Number of students registered for both
+    common = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ('course', 'related')
+        indexes = [
+            models.Index(fields=['course', '-score'], name='related_course_score'),
+        ]
+
+
+class RelatedCoursesRefresh(models.Model):
+    """
+    A course whose registrations changed since its related courses were last
+    computed. Filled by the registration signals, emptied by
+    compute_related_courses.
+    """
+    # No FK constraint: registrations of a course being deleted mark it here
+    # from post_delete, after the cascade was already collected
+    course = models.OneToOneField(
+        Course,
+        primary_key=True,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+    )
+    queued_at = models.DateTimeField(auto_now_add=True)
+
+
+class CourseAnnouncement(models.Model):
+    """
+    A message from the teacher to everyone registered for the course. Stored
+    once, whatever the number of students; delivery is one group_send to
+    the course group (see course_service.announcements).
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='announcements')
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    content = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['course', 'created_at'], name='announcement_course_created'),
+        ]
+
+    def __str__(self):
+        return f"Announcement for {self.course_id} at {self.created_at:%Y-%m-%d %H:%M}"
+
+    def to_dict(self):
+        return {
+            'id': str(self.id),
+            'course': str(self.course_id),
+            'author': str(self.author_id),
+            'content': self.content,
+            'created_at': self.created_at.isoformat(),
+        }
+
+
+class CourseReadState(models.Model):
+    """
+    How far a student has read a course's announcements. Written only when
+    the student marks them read, so there's no row per student per
+    announcement; no row means nothing was read yet.
+    """
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='+')
+    last_read_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('student', 'course')
@@ -0,0 +1,212 @@
+"""
+"Students who took this also took": item-item similarity between courses
+from the student x course registration matrix.
+
+The matrix is loaded in chunks into a scipy sparse matrix X (students x
+courses). Co-registration counts for a batch of courses are one sparse
+product, X[:, batch].T @ X, and scores for all pairs in the batch are
+computed in one go with numpy:
+
+    cosine  = common / sqrt(n_i * n_j)
+    jaccard = common / (n_i + n_j - common)
+
+where n_i is the number of students registered for course i. The top-K
+neighbours of each course are stored in RelatedCourse.
+
+Incremental refresh: a registration change in course d only changes the
+similarities between d and other courses. So the full rows of the changed
+courses are recomputed. The other courses only have their entries for
+those courses merged into their stored top-K. A course needs a full
+recompute as well when one of its stored neighbours lost score, because
+the course that should replace it isn't stored.
+
+numpy and scipy are only needed here; without them the command refuses
+to run and the rest of the app is unaffected.
+"""
+import logging
+from array import array
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from backendtutorhub.db_routers import use_primary
+from .models import Course, CourseRegistration, RelatedCourse, RelatedCoursesRefresh
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:
+    np = sparse = None
+
+logger = logging.getLogger(__name__)
+
+METRICS = ('cosine', 'jaccard')
+
+
+def load_matrix(chunk_size=10000):
+    """(X, course_ids): the csr registration matrix and the course id of each column."""
+    course_ids = list(Course.objects.order_by('pk').values_list('pk', flat=True))
+    course_index = {pk: i for i, pk in enumerate(course_ids)}
+    student_index = {}
+    rows, cols = array('i'), array('i')
+    registrations = CourseRegistration.objects.values_list('student_id', 'course_id').iterator(chunk_size=chunk_size)
+    for student_id, course_id in registrations:
+        column = course_index.get(course_id)
+        if column is None:
+            # Course created after the id list was read
+            continue
+        rows.append(student_index.setdefault(student_id, len(student_index)))
+        cols.append(column)
+
+    rows = np.frombuffer(rows, dtype=np.int32)
+    cols = np.frombuffer(cols, dtype=np.int32)
+    X = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+        shape=(len(student_index), len(course_ids)),
+    )
+    return X, course_ids
+
+
+class Similarity:
+
+    def __init__(self, X, metric='cosine', min_common=1, batch_size=256):
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric {metric!r}, expected one of {METRICS}")
+        self.X = X
+        self.XT = X.T.tocsr()
+        self.counts = np.asarray(X.sum(axis=0), dtype=np.float64).ravel()
+        self.metric = metric
+        self.min_common = min_common
+        self.batch_size = batch_size
+
+    def rows(self, courses):
+        """
+        Yield (course, neighbours, scores, common) for each column index in
+        `courses`, with every neighbour that shares at least min_common
+        students, unsorted.
+        """
+        courses = np.asarray(courses, dtype=np.int64)
+        for start in range(0, len(courses), self.batch_size):
+            batch = courses[start:start + self.batch_size]
+            common = (self.XT[batch] @ self.X).tocsr()
+            common.sort_indices()
+
+            # Score every non-zero of the batch at once
+            row_of = np.repeat(np.arange(len(batch)), np.diff(common.indptr))
+            n_i = self.counts[batch][row_of]
+            n_j = self.counts[common.indices]
+            c = common.data.astype(np.float64)
+            if self.metric == 'cosine':
+                scores = c / np.sqrt(n_i * n_j)
+            else:
+                scores = c / (n_i + n_j - c)
+            keep = (common.indices != batch[row_of]) & (c >= self.min_common)
+
+            for r, course in enumerate(batch):
+                lo, hi = common.indptr[r], common.indptr[r + 1]
+                mask = keep[lo:hi]
+                yield int(course), common.indices[lo:hi][mask], scores[lo:hi][mask], c[lo:hi][mask]
+
+
+def top_k(neighbours, scores, common, k):
+    """The k best (neighbour, score, common), best first, ties by neighbour."""
+    order = np.lexsort((neighbours, -scores))[:k]
+    return list(zip(neighbours[order].tolist(), scores[order].tolist(), common[order].tolist()))
+
+
+def _write(course_ids, results):
+    """Replace the stored neighbours of the courses in `results` {column: [(column, score, common)]}."""
+    with transaction.atomic():
+        RelatedCourse.objects.filter(course_id__in=[course_ids[c] for c in results]).delete()
+        RelatedCourse.objects.bulk_create(
+            [
+                RelatedCourse(course_id=course_ids[c], related_id=course_ids[n], score=score, common=int(common))
+                for c, neighbours in results.items()
+                for n, score, common in neighbours
+            ],
+            batch_size=1000,
+        )
+
+
+def refresh(k=10, metric='cosine', min_common=1, full=False, batch_size=256, chunk_size=10000, log=logger.info):
+    """Recompute the related courses, only for what changed unless `full`."""
+    if np is None:
+        raise ImportError("numpy and scipy are required to compute related courses")
+
+    # Reads the queue and the stored rows it merges into, which a lagging
+    # replica might not have the latest of
+    with use_primary():
+        started = timezone.now()
+        queued = list(RelatedCoursesRefresh.objects.filter(queued_at__lte=started).values_list('course_id', flat=True))
+        full = full or not RelatedCourse.objects.exists()
+        if not full and not queued:
+            log("No registration changes since the last run")
+            return
+
+        X, course_ids = load_matrix(chunk_size)
+        log(f"Loaded {X.nnz} registrations of {X.shape[0]} students in {X.shape[1]} courses")
+        similarity = Similarity(X, metric=metric, min_common=min_common, batch_size=batch_size)
+        column = {pk: i for i, pk in enumerate(course_ids)}
+
+        if full:
+            recompute = list(range(len(course_ids)))
+        else:
+            changed = [column[pk] for pk in queued if pk in column]
+            recompute, merged = _incremental(similarity, changed, course_ids, column, k)
+            _write(course_ids, merged)
+            log(f"{len(changed)} changed courses, merged into {len(merged)} others")
+
+        results = {}
+        for course, neighbours, scores, common in similarity.rows(recompute):
+            results[course] = top_k(neighbours, scores, common, k)
+            if len(results) >= batch_size:
+                _write(course_ids, results)
+                results = {}
+        _write(course_ids, results)
+        log(f"Recomputed {len(recompute)} courses")
+
+        RelatedCoursesRefresh.objects.filter(course_id__in=queued, queued_at__lte=started).delete()
+
+
+def _incremental(similarity, changed, course_ids, column, k):
+    """
+    (recompute, merged): the courses whose rows must be recomputed in full,
+    and the new top-k of the courses that could be patched in place.
+    """
+    changed_set = set(changed)
+    # Similarities between each changed course and everything else. The
+    # matrix is symmetric, so these also are the changed entries of every
+    # other course's row.
+    fresh = defaultdict(dict)
+    for course, neighbours, scores, common in similarity.rows(changed):
+        for neighbour, score, count in zip(neighbours.tolist(), scores.tolist(), common.tolist()):
+            fresh[neighbour][course] = (score, count)
+
+    stored = defaultdict(dict)
+    affected = RelatedCourse.objects.filter(related_id__in=[course_ids[c] for c in changed])
+    touched = set(fresh) | {column[pk] for pk in affected.values_list('course_id', flat=True) if pk in column}
+    touched -= changed_set
+    for course_id, related_id, score, common in RelatedCourse.objects.filter(
+        course_id__in=[course_ids[c] for c in touched],
+    ).values_list('course_id', 'related_id', 'score', 'common'):
+        if related_id in column:
+            stored[column[course_id]][column[related_id]] = (score, common)
+
+    recompute, merged = list(changed), {}
+    for course in touched:
+        current = stored[course]
+        updates = fresh.get(course, {})
+        if any(
+            neighbour in changed_set and updates.get(neighbour, (0, 0))[0] < score
+            for neighbour, (score, _) in current.items()
+        ):
+            recompute.append(course)
+            continue
+        entries = {n: v for n, v in current.items() if n not in changed_set}
+        entries.update(updates)
+        neighbours = np.fromiter(entries, dtype=np.int64, count=len(entries))
+        scores = np.array([v[0] for v in entries.values()], dtype=np.float64)
+        common = np.array([v[1] for v in entries.values()], dtype=np.int64)
+        merged[course] = top_k(neighbours, scores, common, k)
+    return recompute, merged
@@ -0,0 +1,8 @@
+from django.urls import re_path
+
+from . import consumers
+
+websocket_urlpatterns = [
+    re_path(r'ws/teacher/registrations/$', consumers.TeacherRegistrationConsumer.as_asgi()),
+    re_path(r'ws/courses/$', consumers.CourseChannelConsumer.as_asgi()),
+]
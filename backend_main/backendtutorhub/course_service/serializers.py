@@ -1,7 +1,11 @@
-from django.forms import ValidationError
+import logging
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
-from .models import Course, CourseRegistration
+from .models import Course, CourseAnnouncement, CourseRegistration, RelatedCourse
 from users_service.models import User
+from jobs_service.queue import enqueue
+
+logger = logging.getLogger(__name__)
 
 class CourseSerializer(serializers.ModelSerializer):
     class Meta:
@@ -9,7 +13,7 @@ class CourseSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
     def validate_teacher(self, value):
-        print("--->", value)
+        logger.debug("Validating course teacher %s", value)
         if value.role != 'teacher':
             raise serializers.ValidationError("Only users with role='teacher' can be assigned as course creators.")
         return value
@@ -17,7 +21,7 @@ class CourseSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         teacher = self.context['request'].user
         validated_data['teacher'] = teacher
-        print(teacher)
+        logger.debug("Creating course for teacher %s", teacher)
         return super().create(validated_data)
 
 
@@ -44,18 +48,27 @@ class CourseRegistrationSerializer(serializers.ModelSerializer):
         # Get the course object from the validated data
         course = validated_data['course']
 
-        # Check if the user is already registered for this course
-        if CourseRegistration.objects.filter(student=student, course=course).exists():
-            # Raise a custom validation error with a user-friendly message
-            raise ValidationError("You are already registered for this course.")
-
-        # If not already registered, create the CourseRegistration instance
-        # The student is added here from the authenticated user
-        course_registration = CourseRegistration.objects.create(
-            student=student,
-            course=course
-        )
-        print(course_registration)
+        # Create the CourseRegistration instance; the student is added here
+        # from the authenticated user. The unique (student, course) constraint
+        # catches duplicates, which saves an extra query on every registration.
+        # The notification job commits together with the registration.
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    course_registration = CourseRegistration.objects.create(
+                        student=student,
+                        course=course
+                    )
+            except IntegrityError:
+                # Raise a custom validation error with a user-friendly message
+                raise serializers.ValidationError("You are already registered for this course.")
+            logger.debug("Created registration %s", course_registration.pk)
+
+            enqueue(
+                'course_service.notify_teachers_of_registrations',
+                {'registration_id': str(course_registration.pk)},
+                idempotency_key=f'registration-notify:{course_registration.pk}',
+            )
         return course_registration
 
 
@@ -64,4 +77,42 @@ class CoursePublicSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Course
-        fields = ['id', 'title', 'description', 'created_at', 'linktoplaylist', 'teacher']
\ No newline at end of file
+        fields = ['id', 'title', 'description', 'created_at', 'linktoplaylist', 'teacher']
+
+
+class TeacherCourseSerializer(serializers.ModelSerializer):
+    # Only present when the view annotates the prefetched courses (?with_counts=1)
+    registrations_count = serializers.IntegerField(read_only=True, required=False)
+
+    class Meta:
+        model = Course
+        fields = ['id', 'title', 'description', 'created_at', 'linktoplaylist', 'registrations_count']
+
+
+class TeacherProfileSerializer(serializers.ModelSerializer):
+    """
+    Public teacher profile with the teacher's courses embedded.
+    `courses` must be prefetched by the view, otherwise this costs one
+    query per teacher.
+    """
+    courses = TeacherCourseSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'email', 'role', 'bio', 'courses']
+
+
+class RelatedCourseSerializer(serializers.ModelSerializer):
+    course = CourseSerializer(source='related', read_only=True)
+
+    class Meta:
+        model = RelatedCourse
+        fields = ['course', 'score', 'common']
+
+
+class CourseAnnouncementSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = CourseAnnouncement
+        fields = ['id', 'course', 'author', 'content', 'created_at']
+        read_only_fields = ['course', 'author']
@@ -0,0 +1,118 @@
+import threading
+import weakref
+
+from django.db import router, transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import announcements
+from .events import coalescer
+from .models import Course, CourseRegistration, RelatedCourse, RelatedCoursesRefresh
+
+# Courses whose delete is in progress, so the registrations deleted with
+# them don't look their teacher up one by one. Weak so a delete that fails
+# halfway doesn't leave entries behind.
+_deleting_courses = weakref.WeakValueDictionary()
+
+
+def registration_teacher_id(registration):
+    """
+    Teacher of the registration's course, shared by every receiver that
+    needs it: at most one query per registration, none in a course cascade.
+    """
+    if CourseRegistration.course.is_cached(registration):
+        return registration.course.teacher_id
+    # Only the id is kept, keyed by course: a partial Course in the FK cache
+    # would cost a query per deferred field to whoever reads it next
+    cached = getattr(registration, '_teacher_id', None)
+    if cached is not None and cached[0] == registration.course_id:
+        return cached[1]
+    course = _deleting_courses.get(registration.course_id)
+    if course is not None:
+        teacher_id = course.teacher_id
+    else:
+        teacher_id = Course.objects.filter(pk=registration.course_id).values_list('teacher_id', flat=True).first()
+    # The next receiver finds it here
+    registration._teacher_id = (registration.course_id, teacher_id)
+    return teacher_id
+
+
+@receiver(pre_delete, sender=Course, dispatch_uid='course_service.course_deleting')
+def course_deleting(sender, instance, using, **kwargs):
+    _deleting_courses[instance.pk] = instance
+    # Courses that list it lose that entry with the cascade; only a full
+    # recompute of their row finds the course that takes its place
+    _queue_related_refresh(
+        RelatedCourse.objects.using(using).filter(related=instance).values_list('course_id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Course, dispatch_uid='course_service.course_deleted')
+def course_deleted(sender, instance, **kwargs):
+    # pk is still set here, Django only clears it once all signals ran
+    _deleting_courses.pop(instance.pk, None)
+
+
+def _on_commit(registration, **counts):
+    teacher_id = registration_teacher_id(registration)
+    if teacher_id is None:
+        return
+    course_id = registration.course_id
+    transaction.on_commit(
+        lambda: coalescer.add(teacher_id, course_id, **counts),
+        using=router.db_for_write(CourseRegistration),
+    )
+
+
+# Courses to queue for compute_related_courses once the current
+# transaction commits, per thread
+_refresh_pending = threading.local()
+
+
+def _queue_related_refresh(course_ids):
+    course_ids = [pk for pk in course_ids if pk not in _deleting_courses]
+    if not course_ids:
+        # Courses being deleted take their related rows with them
+        return
+    if not hasattr(_refresh_pending, 'courses'):
+        _refresh_pending.courses = set()
+    _refresh_pending.courses.update(course_ids)
+    # The first of these hooks to run writes every pending course in one
+    # upsert, the others find nothing left. After a rollback the ids stay
+    # pending and go out with the next commit, which only costs an extra
+    # refresh.
+    transaction.on_commit(_flush_related_refresh, using=router.db_for_write(RelatedCoursesRefresh))
+
+
+def _flush_related_refresh():
+    course_ids, _refresh_pending.courses = getattr(_refresh_pending, 'courses', set()), set()
+    if not course_ids:
+        return
+    # Upsert so a course queued again while compute_related_courses runs
+    # gets a newer timestamp and survives that run's cleanup
+    RelatedCoursesRefresh.objects.using(router.db_for_write(RelatedCoursesRefresh)).bulk_create(
+        [RelatedCoursesRefresh(course_id=course_id) for course_id in course_ids],
+        update_conflicts=True,
+        unique_fields=['course'],
+        update_fields=['queued_at'],
+    )
+
+
+@receiver(post_save, sender=CourseRegistration, dispatch_uid='course_service.registration_created')
+def registration_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        _on_commit(instance, added=1)
+        _queue_related_refresh([instance.course_id])
+
+
+@receiver(post_delete, sender=CourseRegistration, dispatch_uid='course_service.registration_deleted')
+def registration_deleted(sender, instance, **kwargs):
+    _on_commit(instance, removed=1)
+    _queue_related_refresh([instance.course_id])
+    # A course being deleted won't announce anything any more
+    if instance.course_id not in _deleting_courses:
+        student_id, course_id = instance.student_id, instance.course_id
+        transaction.on_commit(
+            lambda: announcements.left_course(student_id, course_id),
+            using=router.db_for_write(CourseRegistration),
+        )
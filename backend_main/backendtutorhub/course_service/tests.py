@@ -1,3 +1,353 @@
-from django.test import TestCase
+import random
+import threading
+import uuid
+from io import StringIO
+from unittest import mock, skipIf
 
-# Create your tests here.
+from channels.db import database_sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+
+from users_service.models import User, UserRole
+from . import announcements, events, recommendations
+from .signals import registration_teacher_id
+from .consumers import CourseChannelConsumer
+from .models import Course, CourseAnnouncement, CourseRegistration, RelatedCourse, RelatedCoursesRefresh
+
+
+@skipIf(recommendations.np is None, 'numpy and scipy are not installed')
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class IncrementalRelatedCoursesTests(TestCase):
+    """An incremental compute_related_courses run must leave exactly what --full does."""
+
+    def setUp(self):
+        self.random = random.Random(1234)
+        teacher = User.objects.create(username='teacher', role=UserRole.TEACHER)
+        self.students = [User.objects.create(username=f'student{i}') for i in range(40)]
+        self.courses = [Course.objects.create(title=f'Course {i}', teacher=teacher) for i in range(15)]
+        for student in self.students:
+            for course in self.random.sample(self.courses, self.random.randint(1, 6)):
+                self.register(student, course)
+
+    def register(self, student, course):
+        with self.captureOnCommitCallbacks(execute=True):
+            CourseRegistration.objects.get_or_create(student=student, course=course)
+
+    def unregister(self, registration):
+        with self.captureOnCommitCallbacks(execute=True):
+            registration.delete()
+
+    def compute(self, *args, **options):
+        call_command('compute_related_courses', *args, stdout=StringIO(), **options)
+
+    def stored(self):
+        return {
+            (course, related): (round(score, 9), common)
+            for course, related, score, common in RelatedCourse.objects.values_list(
+                'course_id', 'related_id', 'score', 'common',
+            )
+        }
+
+    def change_registrations(self, count):
+        for _ in range(count):
+            if self.random.random() < 0.5:
+                registration = self.random.choice(list(CourseRegistration.objects.all()))
+                self.unregister(registration)
+            else:
+                self.register(self.random.choice(self.students), self.random.choice(self.courses))
+
+    def assert_incremental_matches_full(self, **options):
+        self.compute('--full', **options)
+        for _ in range(6):
+            self.change_registrations(self.random.randint(1, 8))
+            self.assertTrue(RelatedCoursesRefresh.objects.exists())
+            self.compute(**options)
+            self.assertFalse(RelatedCoursesRefresh.objects.exists())
+            incremental = self.stored()
+
+            self.compute('--full', **options)
+            self.assertEqual(incremental, self.stored())
+
+    def test_cosine(self):
+        self.assert_incremental_matches_full(top_k=3)
+
+    def test_jaccard_with_min_common(self):
+        self.assert_incremental_matches_full(top_k=4, metric='jaccard', min_common=2)
+
+    def test_small_batches(self):
+        self.assert_incremental_matches_full(top_k=3, batch_size=2, chunk_size=7)
+
+    def test_course_deleted(self):
+        self.compute('--full', top_k=3)
+        for _ in range(3):
+            course = self.courses.pop(self.random.randrange(len(self.courses)))
+            with self.captureOnCommitCallbacks(execute=True):
+                course.delete()
+            self.change_registrations(2)
+            self.compute(top_k=3)
+            incremental = self.stored()
+
+            self.compute('--full', top_k=3)
+            self.assertEqual(incremental, self.stored())
+
+    def test_nothing_queued_is_a_no_op(self):
+        self.compute('--full', top_k=3)
+        before = self.stored()
+        output = StringIO()
+        call_command('compute_related_courses', top_k=3, stdout=output)
+        self.assertIn('No registration changes', output.getvalue())
+        self.assertEqual(before, self.stored())
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class CourseChannelConsumerTests(TransactionTestCase):
+    """
+    Not a TestCase: the consumer's handlers run through
+    database_sync_to_async, which closes connections that are inside a
+    transaction.
+    """
+
+    def setUp(self):
+        self.teacher = User.objects.create(username='teacher', role=UserRole.TEACHER)
+        self.student = User.objects.create(username='student')
+        self.other = User.objects.create(username='other')
+        self.course = Course.objects.create(title='Algebra', teacher=self.teacher)
+        self.other_course = Course.objects.create(title='Geometry', teacher=self.teacher)
+        self.registration = CourseRegistration.objects.create(student=self.student, course=self.course)
+        CourseRegistration.objects.create(student=self.student, course=self.other_course)
+
+    async def connect(self, user):
+        communicator = WebsocketCommunicator(CourseChannelConsumer.as_asgi(), '/ws/courses/')
+        communicator.scope['user'] = user
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    async def test_anonymous_is_rejected(self):
+        communicator = WebsocketCommunicator(CourseChannelConsumer.as_asgi(), '/ws/courses/')
+        communicator.scope['user'] = AnonymousUser()
+        connected, _ = await communicator.connect()
+        self.assertFalse(connected)
+
+    async def test_unread_counts_on_connect(self):
+        await database_sync_to_async(announcements.announce)(self.course, self.teacher, 'one')
+        await database_sync_to_async(announcements.announce)(self.course, self.teacher, 'two')
+        await database_sync_to_async(announcements.mark_read)(self.student, self.other_course.pk)
+        await database_sync_to_async(announcements.announce)(self.other_course, self.teacher, 'three')
+        await database_sync_to_async(announcements.mark_read)(self.student, self.other_course.pk)
+
+        student = await self.connect(self.student)
+        self.assertEqual(await student.receive_json_from(), {'type': 'unread', 'courses': {str(self.course.pk): 2}})
+        await student.disconnect()
+
+        # Teachers get no unread counts
+        teacher = await self.connect(self.teacher)
+        self.assertTrue(await teacher.receive_nothing())
+        await teacher.disconnect()
+
+    async def test_announce_reaches_members_only(self):
+        teacher = await self.connect(self.teacher)
+        student = await self.connect(self.student)
+        other = await self.connect(self.other)
+        await student.receive_json_from()
+        await other.receive_json_from()
+
+        await teacher.send_json_to({'type': 'announce', 'course': str(self.course.pk), 'message': 'Exam on Monday'})
+        for communicator in (teacher, student):
+            event = await communicator.receive_json_from()
+            self.assertEqual((event['type'], event['course'], event['content']), (
+                'announcement', str(self.course.pk), 'Exam on Monday',
+            ))
+        self.assertTrue(await other.receive_nothing())
+        self.assertEqual(await CourseAnnouncement.objects.acount(), 1)
+
+        for communicator in (teacher, student, other):
+            await communicator.disconnect()
+
+    async def test_member_checks(self):
+        student = await self.connect(self.student)
+        await student.receive_json_from()
+        other = await self.connect(self.other)
+        await other.receive_json_from()
+
+        # A student can't announce, even in their own course
+        await student.send_json_to({'type': 'announce', 'course': str(self.course.pk), 'message': 'hi'})
+        self.assertEqual(await student.receive_json_from(), {
+            'type': 'error', 'error': 'Only the teacher of the course can announce.',
+        })
+        # Nor announce or mark read where they aren't registered
+        for content in (
+            {'type': 'announce', 'course': str(self.course.pk), 'message': 'hi'},
+            {'type': 'read', 'course': str(self.course.pk)},
+        ):
+            await other.send_json_to(content)
+            self.assertEqual(await other.receive_json_from(), {'type': 'error', 'error': 'Not a member of this course.'})
+        self.assertFalse(await CourseAnnouncement.objects.aexists())
+
+        await student.send_json_to({'type': 'read', 'course': str(self.course.pk)})
+        await student.receive_nothing()
+        self.assertEqual(await database_sync_to_async(announcements.unread_counts)(self.student), {})
+
+        await student.disconnect()
+        await other.disconnect()
+
+    async def test_unregistering_leaves_the_course(self):
+        teacher = await self.connect(self.teacher)
+        student = await self.connect(self.student)
+        await student.receive_json_from()
+
+        await database_sync_to_async(self.registration.delete)()
+        # Processed before the next message on the socket
+        await teacher.send_json_to({'type': 'announce', 'course': str(self.course.pk), 'message': 'Exam on Monday'})
+        await teacher.receive_json_from()
+        self.assertTrue(await student.receive_nothing())
+
+        await student.send_json_to({'type': 'read', 'course': str(self.course.pk)})
+        self.assertEqual(await student.receive_json_from(), {'type': 'error', 'error': 'Not a member of this course.'})
+
+        # Still in the other course
+        await teacher.send_json_to({'type': 'announce', 'course': str(self.other_course.pk), 'message': 'Quiz'})
+        await teacher.receive_json_from()
+        self.assertEqual((await student.receive_json_from())['content'], 'Quiz')
+
+        await teacher.disconnect()
+        await student.disconnect()
+
+
+class RegistrationTeacherIdTests(TestCase):
+
+    def setUp(self):
+        self.teacher = User.objects.create(username='teacher', role=UserRole.TEACHER)
+        self.course = Course.objects.create(title='Algebra', teacher=self.teacher)
+        registration = CourseRegistration.objects.create(student=User.objects.create(username='student'), course=self.course)
+        self.registration = CourseRegistration.objects.get(pk=registration.pk)
+
+    def test_looked_up_once(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(registration_teacher_id(self.registration), self.teacher.pk)
+            self.assertEqual(registration_teacher_id(self.registration), self.teacher.pk)
+
+    def test_course_cache_is_left_alone(self):
+        registration_teacher_id(self.registration)
+        self.assertFalse(CourseRegistration.course.is_cached(self.registration))
+        # Loaded in full when asked for, not one deferred field at a time
+        with self.assertNumQueries(1):
+            self.assertEqual((self.registration.course.title, self.registration.course.teacher_id), (
+                'Algebra', self.teacher.pk,
+            ))
+
+    def test_changed_course(self):
+        registration_teacher_id(self.registration)
+        other_teacher = User.objects.create(username='other', role=UserRole.TEACHER)
+        self.registration.course_id = Course.objects.create(title='Geometry', teacher=other_teacher).pk
+        self.assertEqual(registration_teacher_id(self.registration), other_teacher.pk)
+
+    def test_missing_course(self):
+        self.registration.course_id = uuid.uuid4()
+        self.assertIsNone(registration_teacher_id(self.registration))
+
+
+class StubChannelLayer:
+
+    def __init__(self):
+        self.sent = []
+        self.received = threading.Event()
+
+    async def group_send(self, group, event):
+        self.sent.append((group, event))
+        self.received.set()
+
+
+class RegistrationEventCoalescerTests(SimpleTestCase):
+
+    def setUp(self):
+        # Registrations made by earlier tests would otherwise land here
+        events.coalescer.flush()
+        self.layer = StubChannelLayer()
+        patcher = mock.patch.object(events, 'get_channel_layer', return_value=self.layer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def coalescer(self, window):
+        coalescer = events.RegistrationEventCoalescer(window=window)
+        self.addCleanup(coalescer.flush)
+        return coalescer
+
+    def sent(self):
+        return {
+            group: {course['course']: (course['added'], course['removed']) for course in event['courses']}
+            for group, event in self.layer.sent
+        }
+
+    def test_changes_within_the_window_are_one_event(self):
+        coalescer = self.coalescer(window=60)
+        coalescer.add(1, 'algebra', added=1)
+        coalescer.add(1, 'algebra', added=1)
+        coalescer.add(1, 'algebra', removed=1)
+        coalescer.add(1, 'geometry', added=1)
+        coalescer.add(2, 'physics', added=1)
+        self.assertEqual(self.layer.sent, [])
+        # One timer per teacher, not per change
+        self.assertEqual(set(coalescer._timers), {1, 2})
+
+        coalescer.flush()
+        self.assertEqual(len(self.layer.sent), 2)
+        self.assertEqual(self.sent(), {
+            'teacher_registrations_1': {'algebra': (2, 1), 'geometry': (1, 0)},
+            'teacher_registrations_2': {'physics': (1, 0)},
+        })
+        self.assertEqual(self.layer.sent[0][1]['type'], 'registrations.changed')
+        self.assertEqual((coalescer._pending, coalescer._timers), ({}, {}))
+
+    def test_window_elapses(self):
+        coalescer = self.coalescer(window=0.01)
+        coalescer.add(1, 'algebra', added=1)
+        coalescer.add(1, 'algebra', added=1)
+        self.assertTrue(self.layer.received.wait(5))
+        self.assertEqual(self.sent(), {'teacher_registrations_1': {'algebra': (2, 0)}})
+        self.assertEqual(coalescer._timers, {})
+
+    def test_flush_one_teacher(self):
+        coalescer = self.coalescer(window=60)
+        coalescer.add(1, 'algebra', added=1)
+        coalescer.add(2, 'physics', removed=1)
+        timer = coalescer._timers[1]
+
+        coalescer.flush(1)
+        self.assertEqual(self.sent(), {'teacher_registrations_1': {'algebra': (1, 0)}})
+        # Cancelled, so it won't publish an empty batch later
+        self.assertTrue(timer.finished.is_set())
+        self.assertEqual(set(coalescer._pending), {2})
+        # Nothing left to send for that teacher
+        coalescer.flush(1)
+        self.assertEqual(len(self.layer.sent), 1)
+
+        coalescer.flush()
+        self.assertEqual(self.sent()['teacher_registrations_2'], {'physics': (0, 1)})
+
+    def test_no_window_publishes_right_away(self):
+        for window in (0, -1):
+            with self.subTest(window=window):
+                self.layer.sent.clear()
+                coalescer = self.coalescer(window=window)
+                coalescer.add(1, 'algebra', added=1)
+                coalescer.add(1, 'algebra', added=1)
+                self.assertEqual(self.layer.sent, [
+                    ('teacher_registrations_1', {
+                        'type': 'registrations.changed',
+                        'courses': [{'course': 'algebra', 'added': 1, 'removed': 0}],
+                    }),
+                ] * 2)
+                self.assertEqual(coalescer._timers, {})
+
+    @override_settings(REGISTRATION_EVENTS_WINDOW=0)
+    def test_window_from_settings(self):
+        self.coalescer(window=None).add(1, 'algebra', removed=1)
+        self.assertEqual(self.sent(), {'teacher_registrations_1': {'algebra': (0, 1)}})
+
+    def test_failed_publish_is_logged(self):
+        self.layer.group_send = mock.AsyncMock(side_effect=RuntimeError('redis down'))
+        with self.assertLogs(events.logger, 'ERROR'):
+            self.coalescer(window=0).add(1, 'algebra', added=1)
@@ -1,14 +1,26 @@
 from django.urls import path
-from .views import CourseListView,CoursePublicListView, CourseDetailView, CourseRegistrationView, CourseRegistrationDetailView
+from .async_views import AsyncCoursePublicListView, AsyncCourseDetailView, AsyncCourseRegistrationListView
+from .views import CourseListView,CoursePublicListView, CourseDetailView, CourseRegistrationView, CourseRegistrationDetailView, RelatedCourseListView, TeacherPublicListView, TeacherPublicDetailView
+from .views import CourseAnnouncementListView, CourseAnnouncementReadView
 
 urlpatterns = [
     # Public endpoints first
     path('courses/public/', CoursePublicListView.as_view(), name='public-course-list'),
+    path('teachers/public/', TeacherPublicListView.as_view(), name='public-teacher-list'),
+    path('teachers/public/<str:username>/', TeacherPublicDetailView.as_view(), name='public-teacher-detail'),
     # Course-related URLs
     path('courses/', CourseListView.as_view(), name='course-list'),
     path('courses/<uuid:pk>/', CourseDetailView.as_view(), name='course-detail'),
+    path('courses/<uuid:pk>/related/', RelatedCourseListView.as_view(), name='course-related'),
+    path('courses/<uuid:pk>/announcements/', CourseAnnouncementListView.as_view(), name='course-announcement-list'),
+    path('courses/<uuid:pk>/announcements/read/', CourseAnnouncementReadView.as_view(), name='course-announcement-read'),
 
     # Course Registration-related URLs
     path('registrations/', CourseRegistrationView.as_view(), name='course-registration-list'),
     path('registrations/<uuid:pk>/', CourseRegistrationDetailView.as_view(), name='course-registration-detail'),
+
+    # Async (event loop) versions of the read-only endpoints above
+    path('async/courses/public/', AsyncCoursePublicListView.as_view(), name='async-public-course-list'),
+    path('async/courses/<uuid:pk>/', AsyncCourseDetailView.as_view(), name='async-course-detail'),
+    path('async/registrations/', AsyncCourseRegistrationListView.as_view(), name='async-course-registration-list'),
 ]
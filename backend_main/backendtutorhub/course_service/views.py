@@ -1,9 +1,24 @@
+from django.db.models import Count, Prefetch
 from rest_framework import generics
-from .models import Course, CourseRegistration
-from .serializers import CourseSerializer, CourseRegistrationSerializer
+from django_filters.rest_framework import DjangoFilterBackend
+from django.shortcuts import get_object_or_404
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from . import announcements
+from .models import Course, CourseAnnouncement, CourseRegistration, RelatedCourse
+from .serializers import (
+    CourseAnnouncementSerializer,
+    CourseSerializer,
+    CourseRegistrationSerializer,
+    RelatedCourseSerializer,
+    TeacherProfileSerializer,
+)
+from users_service.models import User, UserRole
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import PermissionDenied
 from rest_framework.permissions import AllowAny
+from backendtutorhub.pagination import LimitOffsetPagination
 # Course views
 class CourseListView(generics.ListCreateAPIView):
     queryset = Course.objects.all()
@@ -48,7 +63,6 @@ class CourseDetailView(generics.RetrieveUpdateDestroyAPIView):
         """
         Instantiates and returns the list of permissions that this view requires.
         """
-        print("Allowing any user to view course details")
         # If the request method is GET, allow any user
         if self.request.method == 'GET':
             permission_classes = [AllowAny]
@@ -65,6 +79,7 @@ class CourseRegistrationView(generics.ListCreateAPIView):
     queryset = CourseRegistration.objects.all()
     serializer_class = CourseRegistrationSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = LimitOffsetPagination
 
     # def perform_create(self, serializer):
     #     # Automatically set the student (assuming the user is logged in)
@@ -89,3 +104,97 @@ class CoursePublicListView(generics.ListAPIView):
     queryset = Course.objects.all()
     serializer_class = CourseSerializer
     permission_classes = [AllowAny]  # Allow any user to view courses
+    filter_backends = [DjangoFilterBackend]
+    pagination_class = LimitOffsetPagination
+    filterset_fields = {'teacher': ['exact'], 'teacher__username': ['exact']}
+
+
+class RelatedCourseListView(generics.ListAPIView):
+    """
+    "Students who took this also took", best first. Reads the precomputed
+    RelatedCourse rows (manage.py compute_related_courses) in one query.
+    """
+    serializer_class = RelatedCourseSerializer
+    permission_classes = [AllowAny]
+    filter_backends = []
+
+    def get_queryset(self):
+        return (
+            RelatedCourse.objects.filter(course_id=self.kwargs['pk'])
+            .select_related('related')
+            .order_by('-score', 'related_id')
+        )
+
+
+class CourseMemberMixin:
+    """For course sub-resources only its teacher and registered students may see."""
+
+    def get_course(self):
+        if not hasattr(self, '_course'):
+            course = get_object_or_404(Course, pk=self.kwargs['pk'])
+            user = self.request.user
+            if course.teacher_id != user.pk and not CourseRegistration.objects.filter(course=course, student=user).exists():
+                raise PermissionDenied("You are not registered for this course.")
+            self._course = course
+        return self._course
+
+
+class CourseAnnouncementListView(CourseMemberMixin, generics.ListCreateAPIView):
+    """
+    Announcements of a course, newest first. POST (teacher of the course
+    only) stores the announcement once and pushes it to everyone connected
+    to ws/courses/ with a single group_send.
+    """
+    serializer_class = CourseAnnouncementSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = []
+
+    def get_queryset(self):
+        return CourseAnnouncement.objects.filter(course=self.get_course()).order_by('-created_at')
+
+    def perform_create(self, serializer):
+        course = self.get_course()
+        if course.teacher_id != self.request.user.pk:
+            raise PermissionDenied("Only the teacher of the course can post announcements.")
+        serializer.instance = announcements.announce(course, self.request.user, serializer.validated_data['content'])
+
+
+class CourseAnnouncementReadView(CourseMemberMixin, APIView):
+    """Mark every announcement of the course up to now as read."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        announcements.mark_read(request.user, self.get_course().pk)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class TeacherPublicMixin:
+    """
+    Shared queryset for the public teacher endpoints.
+
+    Courses are loaded with a single prefetch query for the whole page of
+    teachers, so the number of queries doesn't grow with the page size.
+    Pass ?with_counts=1 to also get the number of registrations per course
+    (computed in that same prefetch query).
+    """
+    serializer_class = TeacherProfileSerializer
+    permission_classes = [AllowAny]
+
+    def get_queryset(self):
+        courses = Course.objects.order_by('-created_at')
+        if self.request.query_params.get('with_counts') in ('1', 'true', 'True'):
+            courses = courses.annotate(registrations_count=Count('registrations'))
+        return (
+            User.objects.filter(role=UserRole.TEACHER)
+            .order_by('username')
+            .prefetch_related(Prefetch('courses', queryset=courses))
+        )
+
+
+class TeacherPublicListView(TeacherPublicMixin, generics.ListAPIView):
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['username']
+
+
+class TeacherPublicDetailView(TeacherPublicMixin, generics.RetrieveAPIView):
+    lookup_field = 'username'
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class JobsServiceConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'jobs_service'
+
+    def ready(self):
+        # Register the @job functions from every app's jobs.py
+        autodiscover_modules('jobs')
@@ -0,0 +1,204 @@
+"""
+Storage for the job queue. JOBS_BACKEND picks one of:
+
+- jobs_service.backends.DatabaseBackend (default): jobs are rows of the Job
+  table, written in the caller's transaction, so a job exists exactly when
+  the write that caused it was committed. Workers claim rows with
+  SELECT ... FOR UPDATE SKIP LOCKED where the database supports it.
+- jobs_service.backends.RedisBackend: jobs live in Redis (JOBS_REDIS_URL) and
+  are pushed once the caller's transaction commits. No DB writes at all, at
+  the price of losing jobs queued right before a Redis crash.
+"""
+import json
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job, JobStatus
+
+
+class ClaimedJob:
+    __slots__ = ('id', 'name', 'payload', 'attempts', 'max_attempts')
+
+    def __init__(self, id, name, payload, attempts, max_attempts):
+        self.id = id
+        self.name = name
+        self.payload = payload
+        self.attempts = attempts
+        self.max_attempts = max_attempts
+
+
+def _lock_timeout():
+    # A running job older than this is assumed to belong to a dead worker
+    return getattr(settings, 'JOBS_LOCK_TIMEOUT', 600)
+
+
+class DatabaseBackend:
+
+    def _db(self):
+        return router.db_for_write(Job)
+
+    def push(self, name, payload, idempotency_key=None, delay=0, max_attempts=5):
+        job = Job(
+            name=name,
+            payload=payload,
+            idempotency_key=idempotency_key,
+            max_attempts=max_attempts,
+            run_after=timezone.now() + timedelta(seconds=delay),
+        )
+        # ON CONFLICT DO NOTHING on the idempotency key, which also doesn't
+        # break the caller's transaction the way an IntegrityError would
+        Job.objects.using(self._db()).bulk_create([job], ignore_conflicts=idempotency_key is not None)
+
+    def claim(self, worker_id, limit):
+        db = self._db()
+        now = timezone.now()
+        Job.objects.using(db).filter(
+            status=JobStatus.RUNNING, locked_at__lt=now - timedelta(seconds=_lock_timeout()),
+        ).update(status=JobStatus.QUEUED, locked_by='')
+
+        due = Job.objects.using(db).filter(status=JobStatus.QUEUED, run_after__lte=now).order_by('run_after', 'id')
+        claim = dict(status=JobStatus.RUNNING, locked_by=worker_id, locked_at=now, attempts=F('attempts') + 1)
+
+        with transaction.atomic(using=db):
+            if connections[db].features.has_select_for_update_skip_locked:
+                ids = list(due.select_for_update(skip_locked=True).values_list('id', flat=True)[:limit])
+                Job.objects.using(db).filter(pk__in=ids).update(**claim)
+            else:
+                # e.g. SQLite: make each claim conditional so two workers
+                # can't both take the same job
+                ids = [
+                    pk for pk in due.values_list('id', flat=True)[:limit]
+                    if Job.objects.using(db).filter(pk=pk, status=JobStatus.QUEUED).update(**claim)
+                ]
+
+        return [
+            ClaimedJob(*row)
+            for row in Job.objects.using(db).filter(pk__in=ids).order_by('id').values_list(
+                'id', 'name', 'payload', 'attempts', 'max_attempts',
+            )
+        ]
+
+    def complete(self, jobs):
+        Job.objects.using(self._db()).filter(pk__in=[job.id for job in jobs]).update(
+            status=JobStatus.DONE, finished_at=timezone.now(), locked_by='',
+        )
+
+    def retry(self, job, error, delay):
+        Job.objects.using(self._db()).filter(pk=job.id).update(
+            status=JobStatus.QUEUED,
+            run_after=timezone.now() + timedelta(seconds=delay),
+            last_error=error,
+            locked_by='',
+        )
+
+    def fail(self, job, error):
+        Job.objects.using(self._db()).filter(pk=job.id).update(
+            status=JobStatus.FAILED, last_error=error, finished_at=timezone.now(), locked_by='',
+        )
+
+    def purge(self, older_than):
+        """Delete finished jobs older than `older_than` seconds."""
+        cutoff = timezone.now() - timedelta(seconds=older_than)
+        Job.objects.using(self._db()).filter(status=JobStatus.DONE, finished_at__lt=cutoff).delete()
+
+
+class RedisBackend:
+    """
+    Keys (prefix JOBS_REDIS_PREFIX, default 'jobs'):
+        <prefix>:job:<id>   hash with name, payload, attempts, max_attempts
+        <prefix>:queued     sorted set of job ids by run-at timestamp
+        <prefix>:running    sorted set of job ids by claim timestamp
+        <prefix>:failed     list of job ids that ran out of attempts
+        <prefix>:idem:<key> idempotency marker, expires after JOBS_IDEMPOTENCY_TTL
+    """
+
+    def __init__(self):
+        import redis
+
+        self.redis = redis.Redis.from_url(getattr(settings, 'JOBS_REDIS_URL', 'redis://localhost:6379/1'))
+        self.prefix = getattr(settings, 'JOBS_REDIS_PREFIX', 'jobs')
+
+    def _key(self, *parts):
+        return ':'.join((self.prefix, *map(str, parts)))
+
+    def push(self, name, payload, idempotency_key=None, delay=0, max_attempts=5):
+        transaction.on_commit(
+            lambda: self._push(name, payload, idempotency_key, delay, max_attempts),
+            using=router.db_for_write(Job),
+        )
+
+    def _push(self, name, payload, idempotency_key, delay, max_attempts):
+        if idempotency_key is not None:
+            ttl = getattr(settings, 'JOBS_IDEMPOTENCY_TTL', 86400)
+            if not self.redis.set(self._key('idem', idempotency_key), 1, nx=True, ex=ttl):
+                return
+        job_id = self.redis.incr(self._key('next_id'))
+        pipe = self.redis.pipeline()
+        pipe.hset(self._key('job', job_id), mapping={
+            'name': name,
+            'payload': json.dumps(payload),
+            'attempts': 0,
+            'max_attempts': max_attempts,
+        })
+        pipe.zadd(self._key('queued'), {job_id: time.time() + delay})
+        pipe.execute()
+
+    def claim(self, worker_id, limit):
+        now = time.time()
+        queued, running = self._key('queued'), self._key('running')
+        for job_id in self.redis.zrangebyscore(running, '-inf', now - _lock_timeout()):
+            if self.redis.zrem(running, job_id):
+                self.redis.zadd(queued, {job_id: now})
+
+        claimed = []
+        for job_id in self.redis.zrangebyscore(queued, '-inf', now, start=0, num=limit):
+            # Whoever removes it from the queue owns it
+            if self.redis.zrem(queued, job_id):
+                self.redis.zadd(running, {job_id: now})
+                claimed.append(int(job_id))
+
+        pipe = self.redis.pipeline()
+        for job_id in claimed:
+            pipe.hincrby(self._key('job', job_id), 'attempts', 1)
+            pipe.hgetall(self._key('job', job_id))
+        results = pipe.execute()[1::2]
+        return [
+            ClaimedJob(
+                job_id,
+                data[b'name'].decode(),
+                json.loads(data[b'payload']),
+                int(data[b'attempts']),
+                int(data[b'max_attempts']),
+            )
+            for job_id, data in zip(claimed, results)
+        ]
+
+    def complete(self, jobs):
+        pipe = self.redis.pipeline()
+        for job in jobs:
+            pipe.zrem(self._key('running'), job.id)
+            pipe.delete(self._key('job', job.id))
+        pipe.execute()
+
+    def retry(self, job, error, delay):
+        pipe = self.redis.pipeline()
+        pipe.zrem(self._key('running'), job.id)
+        pipe.hset(self._key('job', job.id), 'last_error', error)
+        pipe.zadd(self._key('queued'), {job.id: time.time() + delay})
+        pipe.execute()
+
+    def fail(self, job, error):
+        pipe = self.redis.pipeline()
+        pipe.zrem(self._key('running'), job.id)
+        pipe.hset(self._key('job', job.id), 'last_error', error)
+        pipe.rpush(self._key('failed'), job.id)
+        pipe.execute()
+
+    def purge(self, older_than):
+        # Finished jobs are deleted right away
+        pass
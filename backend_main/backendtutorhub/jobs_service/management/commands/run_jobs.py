@@ -0,0 +1,46 @@
+import os
+import signal
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from jobs_service.queue import get_backend
+from jobs_service.worker import run_once
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs until stopped (SIGTERM/SIGINT finish the current batch first)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help="Jobs claimed per poll.")
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds to sleep when idle.")
+        parser.add_argument('--once', action='store_true', help="Run what's due now and exit.")
+        parser.add_argument('--purge-after', type=int, default=7 * 86400,
+                            help="Delete finished jobs older than this many seconds.")
+
+    def handle(self, *args, **options):
+        worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        self.stopping = False
+
+        def stop(signum, frame):
+            self.stopping = True
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        self.stdout.write(f'Job worker {worker_id} started')
+        last_purge = 0.0
+        while not self.stopping:
+            close_old_connections()
+            if time.monotonic() - last_purge > 600:
+                get_backend().purge(options['purge_after'])
+                last_purge = time.monotonic()
+
+            claimed = run_once(worker_id, options['batch_size'])
+            if options['once'] and claimed < options['batch_size']:
+                break
+            if not claimed:
+                time.sleep(options['poll_interval'])
+        self.stdout.write(f'Job worker {worker_id} stopped')
@@ -0,0 +1,91 @@
+"""
+Background jobs for side effects that don't have to happen before the
+response is sent (emails, notifications, counters, ...).
+
+Define a job in an app's jobs.py:
+
+    @job('users.send_welcome_email')
+    def send_welcome_email(user_id):
+        ...
+
+    # batch=True: the worker calls the function once with the payloads of
+    # all queued jobs of that name it claimed together
+    @job('courses.notify_registrations', batch=True)
+    def notify_registrations(payloads):
+        ...
+
+and queue it from the request path:
+
+    enqueue('users.send_welcome_email', {'user_id': str(user.pk)},
+            idempotency_key=f'welcome-email:{user.pk}')
+
+Jobs are executed by `python manage.py run_jobs`.
+"""
+import random
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+_registry = {}
+
+
+class JobDefinition:
+
+    def __init__(self, name, func, batch=False, max_attempts=5, backoff=10):
+        self.name = name
+        self.func = func
+        self.batch = batch
+        self.max_attempts = max_attempts
+        # Seconds before the first retry, doubled on each further attempt
+        self.backoff = backoff
+
+    def retry_delay(self, attempts):
+        max_backoff = getattr(settings, 'JOBS_MAX_BACKOFF', 3600)
+        delay = min(self.backoff * 2 ** max(attempts - 1, 0), max_backoff)
+        # Jitter so a batch that failed together doesn't retry together
+        return delay * random.uniform(0.8, 1.2)
+
+
+def job(name, batch=False, max_attempts=5, backoff=10):
+    """Register the decorated function as the job `name`."""
+    def decorator(func):
+        if name in _registry:
+            raise ValueError(f"Job {name!r} is already registered")
+        _registry[name] = JobDefinition(name, func, batch=batch, max_attempts=max_attempts, backoff=backoff)
+        return func
+    return decorator
+
+
+def get_job(name):
+    try:
+        return _registry[name]
+    except KeyError:
+        raise LookupError(f"No job registered as {name!r}")
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = import_string(getattr(settings, 'JOBS_BACKEND', 'jobs_service.backends.DatabaseBackend'))()
+    return _backend
+
+
+def enqueue(name, payload=None, idempotency_key=None, delay=0):
+    """
+    Queue the job `name` with a JSON-serializable `payload`.
+
+    The job is only visible to workers once the surrounding transaction
+    commits, and is dropped if it rolls back. A second enqueue with an
+    idempotency_key that's already known is ignored.
+    """
+    definition = get_job(name)
+    get_backend().push(
+        name,
+        payload or {},
+        idempotency_key=idempotency_key,
+        delay=delay,
+        max_attempts=definition.max_attempts,
+    )
@@ -0,0 +1,269 @@
+import threading
+from datetime import timedelta
+from unittest import mock
+
+from django.core import mail
+from django.db import connection, transaction
+from django.db.models.query import QuerySet
+from django.test import TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from course_service.models import Course, CourseRegistration
+from users_service.models import User, UserRole
+from . import queue, worker
+from .backends import DatabaseBackend
+from .models import Job, JobStatus
+
+
+class JobsTestMixin:
+    """Registers throwaway jobs for the duration of a test."""
+
+    def setUp(self):
+        self.backend = DatabaseBackend()
+        patcher = mock.patch.object(queue, '_backend', self.backend)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.calls = []
+
+    def register(self, name, func=None, **options):
+        queue.job(name, **options)(func or (lambda **payload: self.calls.append(payload)))
+        self.addCleanup(queue._registry.pop, name)
+
+    def push(self, name='tests.job', payload=None, **kwargs):
+        queue.enqueue(name, payload, **kwargs)
+        return Job.objects.latest('id')
+
+    def make_due(self):
+        Job.objects.filter(status=JobStatus.QUEUED).update(run_after=timezone.now())
+
+
+@override_settings(JOBS_LOCK_TIMEOUT=600)
+class DatabaseBackendTests(JobsTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.register('tests.job')
+
+    def test_claim_takes_due_jobs_in_order(self):
+        first = self.push(payload={'n': 1})
+        later = self.push(payload={'n': 2}, delay=60)
+        second = self.push(payload={'n': 3})
+
+        claimed = self.backend.claim('worker-a', 10)
+        self.assertEqual([(job.id, job.payload, job.attempts) for job in claimed], [
+            (first.pk, {'n': 1}, 1),
+            (second.pk, {'n': 3}, 1),
+        ])
+        first.refresh_from_db()
+        self.assertEqual((first.status, first.locked_by), (JobStatus.RUNNING, 'worker-a'))
+        # Nothing left for a second worker, the delayed job isn't due yet
+        self.assertEqual(self.backend.claim('worker-b', 10), [])
+        self.assertEqual(Job.objects.get(pk=later.pk).status, JobStatus.QUEUED)
+
+    def test_claim_respects_limit(self):
+        jobs = [self.push(payload={'n': n}) for n in range(3)]
+        self.assertEqual([job.id for job in self.backend.claim('worker-a', 2)], [jobs[0].pk, jobs[1].pk])
+        self.assertEqual([job.id for job in self.backend.claim('worker-b', 2)], [jobs[2].pk])
+
+    def test_conditional_claim_loses_race(self):
+        """Without SKIP LOCKED a job another worker took in the meantime is left alone."""
+        stolen, free = self.push(), self.push()
+        update = QuerySet.update
+
+        def racing_update(qs, **kwargs):
+            if kwargs.get('locked_by') == 'worker-b' and not Job.objects.filter(locked_by='worker-a').exists():
+                update(Job.objects.filter(pk=stolen.pk), status=JobStatus.RUNNING, locked_by='worker-a')
+            return update(qs, **kwargs)
+
+        with mock.patch.object(connection.features, 'has_select_for_update_skip_locked', False), \
+                mock.patch.object(QuerySet, 'update', racing_update):
+            claimed = self.backend.claim('worker-b', 10)
+        self.assertEqual([job.id for job in claimed], [free.pk])
+        self.assertEqual(Job.objects.get(pk=stolen.pk).locked_by, 'worker-a')
+
+    def test_skip_locked_claim(self):
+        # SQLite ignores FOR UPDATE, so this runs the SKIP LOCKED branch
+        # everywhere; SkipLockedClaimTests covers the locking itself
+        jobs = [self.push(payload={'n': n}) for n in range(3)]
+        with mock.patch.object(connection.features, 'has_select_for_update_skip_locked', True):
+            claimed = self.backend.claim('worker-a', 2)
+        self.assertEqual([(job.id, job.attempts) for job in claimed], [(jobs[0].pk, 1), (jobs[1].pk, 1)])
+        self.assertEqual(Job.objects.filter(status=JobStatus.RUNNING, locked_by='worker-a').count(), 2)
+
+    def test_stale_running_jobs_are_requeued(self):
+        stale, fresh = self.push(), self.push()
+        self.backend.claim('dead-worker', 10)
+        Job.objects.filter(pk=stale.pk).update(locked_at=timezone.now() - timedelta(seconds=601))
+
+        claimed = self.backend.claim('worker-a', 10)
+        self.assertEqual([(job.id, job.attempts) for job in claimed], [(stale.pk, 2)])
+        self.assertEqual(Job.objects.get(pk=fresh.pk).locked_by, 'dead-worker')
+
+    def test_idempotency_key(self):
+        self.push(payload={'n': 1}, idempotency_key='once')
+        with transaction.atomic():
+            # Doesn't break the surrounding transaction either
+            self.push(payload={'n': 2}, idempotency_key='once')
+            self.push(payload={'n': 3})
+        self.assertEqual(sorted(job.payload['n'] for job in Job.objects.all()), [1, 3])
+
+    def test_rolled_back_enqueue(self):
+        with self.assertRaises(ZeroDivisionError), transaction.atomic():
+            self.push()
+            1 / 0
+        self.assertFalse(Job.objects.exists())
+
+    def test_purge(self):
+        old, recent = self.push(), self.push()
+        self.backend.complete(self.backend.claim('worker-a', 10))
+        Job.objects.filter(pk=old.pk).update(finished_at=timezone.now() - timedelta(days=2))
+        self.backend.purge(older_than=86400)
+        self.assertEqual(list(Job.objects.values_list('pk', flat=True)), [recent.pk])
+
+
+@skipUnlessDBFeature('has_select_for_update_skip_locked')
+class SkipLockedClaimTests(JobsTestMixin, TransactionTestCase):
+    """A row locked by another transaction is skipped, not waited for."""
+
+    def test_locked_job_is_skipped(self):
+        self.register('tests.job')
+        locked, free = self.push(), self.push()
+        is_locked, release = threading.Event(), threading.Event()
+
+        def hold_lock():
+            try:
+                with transaction.atomic():
+                    list(Job.objects.select_for_update().filter(pk=locked.pk))
+                    is_locked.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=hold_lock)
+        thread.start()
+        try:
+            self.assertTrue(is_locked.wait(10))
+            self.assertEqual([job.id for job in self.backend.claim('worker-a', 10)], [free.pk])
+        finally:
+            release.set()
+            thread.join()
+        self.assertEqual([job.id for job in self.backend.claim('worker-b', 10)], [locked.pk])
+
+
+class WorkerTests(JobsTestMixin, TestCase):
+
+    def test_retries_with_backoff_until_failed(self):
+        def broken(**payload):
+            raise RuntimeError('boom')
+
+        self.register('tests.broken', broken, max_attempts=3, backoff=10)
+        job = self.push('tests.broken')
+
+        with mock.patch.object(queue.random, 'uniform', return_value=1.0):
+            for delay in (10, 20):
+                before = timezone.now()
+                self.assertEqual(worker.run_once('worker-a'), 1)
+                job.refresh_from_db()
+                self.assertEqual(job.status, JobStatus.QUEUED)
+                self.assertAlmostEqual((job.run_after - before).total_seconds(), delay, delta=1)
+                self.assertIn('RuntimeError: boom', job.last_error)
+                # Not due until the delay is up
+                self.assertEqual(worker.run_once('worker-a'), 0)
+                self.make_due()
+
+            self.assertEqual(worker.run_once('worker-a'), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (JobStatus.FAILED, 3))
+        self.assertIsNotNone(job.finished_at)
+        self.make_due()
+        self.assertEqual(worker.run_once('worker-a'), 0)
+
+    @override_settings(JOBS_MAX_BACKOFF=60)
+    def test_retry_delay(self):
+        definition = queue.JobDefinition('tests.job', None, backoff=10)
+        with mock.patch.object(queue.random, 'uniform', return_value=1.0):
+            self.assertEqual([definition.retry_delay(n) for n in range(1, 6)], [10, 20, 40, 60, 60])
+        for _ in range(20):
+            self.assertTrue(8 <= definition.retry_delay(1) <= 12)
+
+    def test_batch_jobs_are_grouped(self):
+        batches = []
+        self.register('tests.single')
+        self.register('tests.batch', batches.append, batch=True)
+        self.push('tests.batch', {'n': 1})
+        self.push('tests.single', {'n': 2})
+        self.push('tests.batch', {'n': 3})
+        self.push('tests.single', {'n': 4})
+
+        self.assertEqual(worker.run_once('worker-a'), 4)
+        self.assertEqual(batches, [[{'n': 1}, {'n': 3}]])
+        self.assertEqual(self.calls, [{'n': 2}, {'n': 4}])
+        self.assertEqual(Job.objects.filter(status=JobStatus.DONE).count(), 4)
+
+    def test_failed_batch_is_retried_as_a_whole(self):
+        def broken(payloads):
+            raise RuntimeError('boom')
+
+        self.register('tests.batch', broken, batch=True)
+        self.push('tests.batch', {'n': 1})
+        self.push('tests.batch', {'n': 2})
+        worker.run_once('worker-a')
+        self.assertEqual(Job.objects.filter(status=JobStatus.QUEUED, attempts=1).count(), 2)
+
+    def test_unknown_job_fails(self):
+        # e.g. queued by a newer release than the worker runs
+        job = Job.objects.create(name='tests.gone')
+
+        worker.run_once('worker-a')
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatus.FAILED)
+        self.assertIn('tests.gone', job.last_error)
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class EnqueueFromRequestTests(JobsTestMixin, TestCase):
+    """The jobs queued by the API commit with the row they're about, or not at all."""
+
+    def test_signup_sends_welcome_email(self):
+        response = APIClient().post('/api/users/signup/', {
+            'username': 'ada', 'password': 'correct horse', 'email': 'ada@example.com',
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(Job.objects.get().idempotency_key, f"welcome-email:{response.json()['id']}")
+
+        worker.run_once('worker-a')
+        self.assertEqual([message.to for message in mail.outbox], [['ada@example.com']])
+
+    def test_failed_enqueue_rolls_back_signup(self):
+        with mock.patch.object(self.backend, 'push', side_effect=RuntimeError('queue down')), \
+                self.assertRaises(RuntimeError), self.assertLogs('django.request', 'ERROR'):
+            APIClient().post('/api/users/signup/', {'username': 'ada', 'password': 'correct horse'}, format='json')
+        self.assertFalse(User.objects.filter(username='ada').exists())
+
+    def test_registration_notifies_teacher(self):
+        teacher = User.objects.create(username='teacher', role=UserRole.TEACHER, email='teacher@example.com')
+        course = Course.objects.create(title='Algebra', teacher=teacher)
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username='student'))
+
+        response = client.post('/api/registrations/', {'course': str(course.pk)}, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        # The duplicate is turned away without a second job
+        response = client.post('/api/registrations/', {'course': str(course.pk)}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Job.objects.count(), 1)
+
+        worker.run_once('worker-a')
+        self.assertEqual([message.to for message in mail.outbox], [['teacher@example.com']])
+
+    def test_failed_enqueue_rolls_back_registration(self):
+        teacher = User.objects.create(username='teacher', role=UserRole.TEACHER)
+        course = Course.objects.create(title='Algebra', teacher=teacher)
+        client = APIClient(raise_request_exception=True)
+        client.force_authenticate(User.objects.create(username='student'))
+
+        with mock.patch.object(self.backend, 'push', side_effect=RuntimeError('queue down')), \
+                self.assertRaises(RuntimeError), self.assertLogs('django.request', 'ERROR'):
+            client.post('/api/registrations/', {'course': str(course.pk)}, format='json')
+        self.assertFalse(CourseRegistration.objects.exists())
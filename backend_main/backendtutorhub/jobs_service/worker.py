@@ -0,0 +1,62 @@
+import logging
+import traceback
+
+from backendtutorhub.db_routers import use_primary
+from .queue import get_backend, get_job
+
+logger = logging.getLogger(__name__)
+
+
+def _run(definition, jobs, call, backend):
+    try:
+        call()
+    except Exception:
+        error = traceback.format_exc()
+        for job in jobs:
+            if job.attempts >= job.max_attempts:
+                logger.error("Job %s #%s failed for good after %s attempts", job.name, job.id, job.attempts)
+                backend.fail(job, error)
+            else:
+                delay = definition.retry_delay(job.attempts)
+                logger.warning("Job %s #%s failed, retrying in %.0fs", job.name, job.id, delay)
+                backend.retry(job, error, delay)
+    else:
+        backend.complete(jobs)
+
+
+def process(jobs, backend=None):
+    """
+    Run claimed jobs. Jobs registered with batch=True are handed to their
+    function together, one call per job name; a failure retries the whole
+    batch.
+    """
+    backend = backend or get_backend()
+    groups = {}
+    for job in jobs:
+        groups.setdefault(job.name, []).append(job)
+
+    for name, group in groups.items():
+        try:
+            definition = get_job(name)
+        except LookupError as exc:
+            for job in group:
+                backend.fail(job, str(exc))
+            continue
+
+        if definition.batch:
+            _run(definition, group, lambda: definition.func([job.payload for job in group]), backend)
+        else:
+            for job in group:
+                _run(definition, [job], lambda: definition.func(**job.payload), backend)
+
+
+def run_once(worker_id, limit=100):
+    """Claim and run up to `limit` due jobs. Returns how many were claimed."""
+    backend = get_backend()
+    jobs = backend.claim(worker_id, limit)
+    if jobs:
+        # Jobs usually look up rows committed moments ago, which a replica
+        # may not have yet
+        with use_primary():
+            process(jobs, backend)
+    return len(jobs)
@@ -1,4 +1,24 @@
 from django.contrib import admin
+from django.utils.text import Truncator
+from backendtutorhub.admin_tools import LargeTableAdmin
 from message_service.models import Message
 # Register your models here.
-admin.site.register(Message)
\ No newline at end of file
+
+
+@admin.register(Message)
+class MessageAdmin(LargeTableAdmin):
+    list_display = ['id', 'sender', 'receiver', 'preview', 'timestamp']
+    list_select_related = ['sender', 'receiver']
+    raw_id_fields = ['sender', 'receiver']
+    # Exact, case-sensitive usernames only, so the unique index on username is
+    # used; a substring search over content would scan the table
+    search_fields = ['sender__username__exact', 'receiver__username__exact']
+    ordering = ['-timestamp']
+    # No date_hierarchy: its year/month links come from a SELECT DISTINCT over
+    # the truncated dates of the whole table. The date filter's ranges use
+    # the index on timestamp.
+    list_filter = ['timestamp']
+
+    @admin.display(description='Content')
+    def preview(self, obj):
+        return Truncator(obj.content).chars(80)
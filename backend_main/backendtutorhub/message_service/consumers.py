@@ -1,20 +1,30 @@
 # messages/consumers.py
 
 import json
+import logging
 from channels.generic.websocket import JsonWebsocketConsumer
 from asgiref.sync import async_to_sync
 # from django.contrib.auth import get_user_model
 from .models import Message
 from users_service.models import User
+from backendtutorhub.metrics import (
+    CHANNEL_LAYER_DURATION,
+    CHAT_MESSAGES_DELIVERED,
+    CHAT_MESSAGES_RECEIVED,
+    WEBSOCKET_CONNECTIONS,
+)
+from backendtutorhub.profiling import ProfilingConsumerMixin
 
+logger = logging.getLogger(__name__)
 
-class ChatConsumer(JsonWebsocketConsumer):
+
+class ChatConsumer(ProfilingConsumerMixin, JsonWebsocketConsumer):
 
     def connect(self):
         # --- TEMPORARILY COMMENT OUT FOR WEBSOCAT TESTING ---
         # Ensure the user is authenticated
         if not self.scope["user"].is_authenticated:
-            print("WebSocket connection rejected: User not authenticated")
+            logger.info("WebSocket connection rejected: User not authenticated")
             self.close() # Close the connection if not authenticated
             return
         # --- END TEMPORARY CHANGE ---
@@ -25,7 +35,7 @@ class ChatConsumer(JsonWebsocketConsumer):
 
         self.user = self.scope["user"] # Get the user (might be AnonymousUser)
         if not self.user.is_authenticated:
-             print("WARNING: Anonymous user connected to WebSocket!")
+             logger.warning("Anonymous user connected to WebSocket!")
              # If you want to block anonymous *messaging*, you'll need checks in receive_json too.
              # For now, let's just allow the connection for testing.
              # If you really need a user object for group name, you'll need the auth check enabled
@@ -51,29 +61,36 @@ class ChatConsumer(JsonWebsocketConsumer):
         self.room_group_name = f'chat_{user_pks[0]}_{user_pks[1]}'
 
         # Join room group
-        async_to_sync(self.channel_layer.group_add)(
-            self.room_group_name,
-            self.channel_name
-        )
+        with CHANNEL_LAYER_DURATION.labels('group_add').time():
+            async_to_sync(self.channel_layer.group_add)(
+                self.room_group_name,
+                self.channel_name
+            )
 
         self.accept()
-        print(f"WebSocket connected: {self.user.username} chatting with {self.other_user.username}")
+        WEBSOCKET_CONNECTIONS.labels(type(self).__name__).inc()
+        # disconnect() runs even if connect() failed halfway, e.g. in group_add
+        self.connection_counted = True
+        logger.debug("WebSocket connected: %s chatting with %s", self.user.username, self.other_user.username)
 
     def disconnect(self, close_code):
         # Leave room group
+        if getattr(self, 'connection_counted', False):
+            WEBSOCKET_CONNECTIONS.labels(type(self).__name__).dec()
         if hasattr(self, 'room_group_name'):
-            async_to_sync(self.channel_layer.group_discard)(
-                self.room_group_name,
-                self.channel_name
-            )
-        print(f"WebSocket disconnected: {self.scope['user'].username if self.scope['user'].is_authenticated else 'Anonymous'}")
+            with CHANNEL_LAYER_DURATION.labels('group_discard').time():
+                async_to_sync(self.channel_layer.group_discard)(
+                    self.room_group_name,
+                    self.channel_name
+                )
+        logger.debug("WebSocket disconnected: %s", self.scope['user'].username if self.scope['user'].is_authenticated else 'Anonymous')
 
 
     # Receive message from WebSocket
     def receive_json(self, content):
         # Ensure the user is authenticated and the connection was properly established
         if not self.scope["user"].is_authenticated or not hasattr(self, 'other_user'):
-            print("Received message from unauthenticated or improperly connected user.")
+            logger.warning("Received message from unauthenticated or improperly connected user.")
             # return temperaroy
 
         # Expected message format: {'type': 'chat_message', 'message': '...', 'receiver_id': ...}
@@ -82,6 +99,7 @@ class ChatConsumer(JsonWebsocketConsumer):
         message_text = content.get('message')
 
         if message_type == 'chat_message' and message_text is not None:
+            CHAT_MESSAGES_RECEIVED.inc()
             sender = self.user
             receiver = self.other_user
 
@@ -91,19 +109,20 @@ class ChatConsumer(JsonWebsocketConsumer):
                 receiver=receiver,
                 content=message_text
             )
-            print(f"Message saved: {message.id}")
+            logger.debug("Message saved: %s", message.id)
 
             # Send message to room group (including the sender's channel)
             # The `chat.message` type will be handled by the `chat_message` method below
-            async_to_sync(self.channel_layer.group_send)(
-                self.room_group_name,
-                {
-                    'type': 'chat.message', # Calls the chat_message method
-                    'message': message.to_dict(), # Send the message data as a dictionary
-                }
-            )
+            with CHANNEL_LAYER_DURATION.labels('group_send').time():
+                async_to_sync(self.channel_layer.group_send)(
+                    self.room_group_name,
+                    {
+                        'type': 'chat.message', # Calls the chat_message method
+                        'message': message.to_dict(), # Send the message data as a dictionary
+                    }
+                )
         else:
-            print(f"Received unknown message format: {content}")
+            logger.warning("Received unknown message format: %s", content)
 
 
     # Receive message from room group (called by channel layer)
@@ -111,4 +130,5 @@ class ChatConsumer(JsonWebsocketConsumer):
         # Send message over the WebSocket to the client
         message_data = event['message']
         self.send_json(message_data)
-        print(f"Message sent over WebSocket: {message_data.get('content')}")
\ No newline at end of file
+        CHAT_MESSAGES_DELIVERED.inc()
+        logger.debug("Message sent over WebSocket: %s", message_data.get('content'))
\ No newline at end of file
@@ -0,0 +1,69 @@
+"""
+Full-text index on Message.content, see message_service.search.
+
+PostgreSQL: a GIN index over (sender_id, receiver_id, to_tsvector(content)).
+btree_gin lets the participant columns live in the same index, so "my
+messages matching X" is answered by the index alone.
+
+SQLite: an external-content FTS5 table kept up to date by triggers.
+
+Other databases get nothing and search falls back to a LIKE scan.
+"""
+from django.db import migrations
+
+POSTGRES_FORWARD = [
+    'CREATE EXTENSION IF NOT EXISTS btree_gin',
+    "CREATE INDEX message_search_idx ON message_service_message USING gin "
+    "(sender_id, receiver_id, (to_tsvector('simple'::regconfig, content)))",
+]
+POSTGRES_BACKWARD = [
+    'DROP INDEX IF EXISTS message_search_idx',
+]
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE message_service_message_fts USING fts5("
+    "content, content='message_service_message', content_rowid='id', tokenize='unicode61')",
+    "CREATE TRIGGER message_service_message_fts_insert AFTER INSERT ON message_service_message BEGIN "
+    "INSERT INTO message_service_message_fts(rowid, content) VALUES (new.id, new.content); END",
+    "CREATE TRIGGER message_service_message_fts_delete AFTER DELETE ON message_service_message BEGIN "
+    "INSERT INTO message_service_message_fts(message_service_message_fts, rowid, content) "
+    "VALUES ('delete', old.id, old.content); END",
+    "CREATE TRIGGER message_service_message_fts_update AFTER UPDATE OF content ON message_service_message BEGIN "
+    "INSERT INTO message_service_message_fts(message_service_message_fts, rowid, content) "
+    "VALUES ('delete', old.id, old.content); "
+    "INSERT INTO message_service_message_fts(rowid, content) VALUES (new.id, new.content); END",
+    # Index the messages that already exist; the triggers take it from here
+    "INSERT INTO message_service_message_fts(message_service_message_fts) VALUES ('rebuild')",
+]
+SQLITE_BACKWARD = [
+    'DROP TRIGGER IF EXISTS message_service_message_fts_insert',
+    'DROP TRIGGER IF EXISTS message_service_message_fts_delete',
+    'DROP TRIGGER IF EXISTS message_service_message_fts_update',
+    'DROP TABLE IF EXISTS message_service_message_fts',
+]
+
+STATEMENTS = {
+    'postgresql': (POSTGRES_FORWARD, POSTGRES_BACKWARD),
+    'sqlite': (SQLITE_FORWARD, SQLITE_BACKWARD),
+}
+
+
+def run(direction):
+    def operation(apps, schema_editor):
+        statements = STATEMENTS.get(schema_editor.connection.vendor)
+        if statements is None:
+            return
+        for sql in statements[direction]:
+            schema_editor.execute(sql)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('message_service', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(run(0), run(1)),
+    ]
@@ -21,6 +21,9 @@ class Message(models.Model):
 
     class Meta:
         ordering = ['timestamp'] # Order messages chronologically
+        indexes = [
+            models.Index(fields=['timestamp'], name='message_timestamp'),
+        ]
 
     def __str__(self):
         return f"From {self.sender.username} to {self.receiver.username} at {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
@@ -0,0 +1,142 @@
+"""
+Full-text search over the messages a user sent or received.
+
+Results are ordered by relevance, best first, with the message id as tie
+breaker, and paged by keyset: the next page continues after the (score, id)
+of the last result, so new messages arriving in between don't shift pages.
+
+- PostgreSQL: websearch_to_tsquery() against the GIN expression index
+  created in migration 0003 ('simple' config, so no language-specific
+  stemming of mixed-language chats), ranked with ts_rank.
+- SQLite: the FTS5 table from the same migration, ranked with bm25.
+- Anything else: a case-insensitive substring scan, newest first.
+
+Both indexes are maintained by the database on every INSERT/UPDATE/DELETE,
+including the ones ChatConsumer makes, so there is nothing to rebuild.
+"""
+import re
+
+from django.db import connections, router
+from django.db.models import F, Func, Q
+from django.utils.html import escape
+
+from .models import Message
+
+SEARCH_CONFIG = 'simple'
+# Highlight markers for snippets: control characters that don't occur in
+# typed text, swapped for <mark> after the snippet is HTML-escaped
+_START, _STOP = '\x02', '\x03'
+
+# Must match the index expression in migration 0003 exactly
+VECTOR_TEMPLATE = "to_tsvector('simple'::regconfig, %(expressions)s)"
+
+
+def _snippet(text):
+    return escape(text).replace(_START, '<mark>').replace(_STOP, '</mark>')
+
+
+def _participant_filter(user, other_user):
+    if other_user is None:
+        return Q(sender=user) | Q(receiver=user)
+    return Q(sender=user, receiver=other_user) | Q(sender=other_user, receiver=user)
+
+
+def _search_postgresql(db, user, query, limit, after, other_user):
+    # Imports psycopg, so only when actually on PostgreSQL
+    from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, SearchVectorField
+
+    def vector():
+        return Func(F('content'), template=VECTOR_TEMPLATE, output_field=SearchVectorField())
+
+    search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+    messages = (
+        Message.objects.using(db)
+        .filter(_participant_filter(user, other_user))
+        .alias(vector=vector())
+        .filter(vector=search_query)
+        .annotate(score=SearchRank(vector(), search_query))
+    )
+    if after is not None:
+        score, pk = after
+        messages = messages.filter(Q(score__lt=score) | Q(score=score, pk__lt=pk))
+    messages = (
+        messages.annotate(snippet=SearchHeadline(
+            'content', search_query, config=SEARCH_CONFIG,
+            start_sel=_START, stop_sel=_STOP, max_fragments=2, max_words=20, min_words=5,
+        ))
+        .select_related('sender', 'receiver')
+        .order_by('-score', '-pk')[:limit]
+    )
+    return [(message, message.score, _snippet(message.snippet)) for message in messages]
+
+
+def _fts5_query(query):
+    # Every word has to appear; quoting turns FTS5 syntax in user input
+    # (AND, NEAR, *, column filters, ...) into plain words
+    words = re.findall(r'\w+', query)
+    return ' '.join('"%s"' % word.replace('"', '""') for word in words)
+
+
+def _search_sqlite(db, user, query, limit, after, other_user):
+    match = _fts5_query(query)
+    if not match:
+        return []
+    connection = connections[db]
+    # UUIDs as the database stores them
+    user_field = Message._meta.get_field('sender').target_field
+    me = user_field.get_db_prep_value(user.pk, connection)
+
+    # bm25() is lower for better matches, negate it so higher is better
+    # like on PostgreSQL
+    sql = [
+        "SELECT m.id, -bm25(message_service_message_fts) AS score, "
+        "snippet(message_service_message_fts, 0, %s, %s, '…', 12) "
+        "FROM message_service_message_fts "
+        "JOIN message_service_message m ON m.id = message_service_message_fts.rowid "
+        "WHERE message_service_message_fts MATCH %s",
+    ]
+    params = [_START, _STOP, match]
+    if other_user is None:
+        sql.append("AND (m.sender_id = %s OR m.receiver_id = %s)")
+        params += [me, me]
+    else:
+        other = user_field.get_db_prep_value(other_user.pk, connection)
+        sql.append("AND ((m.sender_id = %s AND m.receiver_id = %s) OR (m.sender_id = %s AND m.receiver_id = %s))")
+        params += [me, other, other, me]
+    if after is not None:
+        sql.append("AND (score < %s OR (score = %s AND m.id < %s))")
+        params += [after[0], after[0], after[1]]
+    sql.append("ORDER BY score DESC, m.id DESC LIMIT %s")
+    params.append(limit)
+
+    with connection.cursor() as cursor:
+        cursor.execute(' '.join(sql), params)
+        rows = cursor.fetchall()
+    messages = Message.objects.using(db).select_related('sender', 'receiver').in_bulk([row[0] for row in rows])
+    return [(messages[pk], score, _snippet(snippet)) for pk, score, snippet in rows if pk in messages]
+
+
+def _search_fallback(db, user, query, limit, after, other_user):
+    messages = Message.objects.using(db).filter(_participant_filter(user, other_user), content__icontains=query)
+    if after is not None:
+        messages = messages.filter(pk__lt=after[1])
+    messages = messages.select_related('sender', 'receiver').order_by('-pk')[:limit]
+    return [(message, 0.0, escape(message.content)) for message in messages]
+
+
+BACKENDS = {
+    'postgresql': _search_postgresql,
+    'sqlite': _search_sqlite,
+}
+
+
+def search_messages(user, query, limit, after=None, other_user=None):
+    """
+    Up to `limit` (message, score, snippet) tuples for messages `user` sent or
+    received matching `query`, starting after the (score, id) key `after`.
+    With `other_user` only the conversation between the two is searched.
+    Snippets are HTML-escaped with the matches wrapped in <mark>.
+    """
+    db = router.db_for_read(Message)
+    backend = BACKENDS.get(connections[db].vendor, _search_fallback)
+    return backend(db, user, query, limit, after, other_user)
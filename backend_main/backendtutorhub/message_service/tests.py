@@ -1,3 +1,129 @@
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from users_service.models import User
+from .models import Message
+from .search import _fts5_query
+
+
+class FTS5QueryTests(SimpleTestCase):
+
+    def test_operators_become_words(self):
+        self.assertEqual(_fts5_query('cats AND dogs'), '"cats" "AND" "dogs"')
+        self.assertEqual(_fts5_query('NEAR(cats dogs, 2)'), '"NEAR" "cats" "dogs" "2"')
+        self.assertEqual(_fts5_query('content:cats* -dogs ^birds'), '"content" "cats" "dogs" "birds"')
+        self.assertEqual(_fts5_query('"unbalanced'), '"unbalanced"')
+
+    def test_nothing_searchable(self):
+        self.assertEqual(_fts5_query('* : " ( )'), '')
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class MessageSearchViewTests(TestCase):
+
+    def setUp(self):
+        self.alice = User.objects.create(username='alice')
+        self.bob = User.objects.create(username='bob')
+        self.carol = User.objects.create(username='carol')
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+
+    def message(self, sender, receiver, content):
+        return Message.objects.create(sender=sender, receiver=receiver, content=content)
+
+    def search(self, status=200, **params):
+        response = self.client.get('/api/messages/search/', params)
+        self.assertEqual(response.status_code, status, response.content)
+        return response.json()
+
+    def ids(self, **params):
+        return [hit['id'] for hit in self.search(**params)['results']]
+
+    def test_all_words_must_match(self):
+        both = self.message(self.alice, self.bob, 'the exam is on monday')
+        self.message(self.alice, self.bob, 'the exam is on friday')
+        self.assertEqual(self.ids(q='monday exam'), [both.pk])
+        self.assertEqual(self.ids(q='EXAM Monday'), [both.pk])
+
+    def test_operator_input_is_searched_as_words(self):
+        literal = self.message(self.alice, self.bob, 'content: cats or dogs, and near the river')
+        self.message(self.alice, self.bob, 'cats only')
+        for q in ('cats AND dogs', 'cats NEAR dogs', 'content:cats dogs*', '"cats dogs', '-dogs cats', 'cats OR dogs'):
+            with self.subTest(q=q):
+                hits = self.ids(q=q)
+                # Each word has to be in the message, operators included;
+                # as FTS5 syntax they'd have failed to parse or matched
+                # 'cats only' too
+                self.assertIn(literal.pk, hits)
+                self.assertEqual(len(hits), 1)
+
+    def test_query_without_words(self):
+        self.message(self.alice, self.bob, 'hello')
+        self.assertEqual(self.search(q='* ( "')['results'], [])
+
+    def test_only_own_messages(self):
+        sent = self.message(self.alice, self.bob, 'lunch today?')
+        received = self.message(self.carol, self.alice, 'lunch tomorrow')
+        self.message(self.bob, self.carol, 'lunch without alice')
+        self.assertCountEqual(self.ids(q='lunch'), [sent.pk, received.pk])
+
+    def test_with_restricts_to_one_conversation(self):
+        to_bob = self.message(self.alice, self.bob, 'lunch today?')
+        from_bob = self.message(self.bob, self.alice, 'lunch sounds good')
+        self.message(self.carol, self.alice, 'lunch tomorrow')
+        self.message(self.bob, self.carol, 'lunch without alice')
+        self.assertCountEqual(self.ids(q='lunch', **{'with': 'bob'}), [to_bob.pk, from_bob.pk])
+        self.search(status=404, q='lunch', **{'with': 'nobody'})
+
+    def test_keyset_paging(self):
+        # Pairs of equal score, so pages also end in the middle of a tie
+        messages = [
+            self.message(self.alice, self.bob, 'report ' + 'filler ' * (i // 2) + ('report' if i % 6 < 2 else ''))
+            for i in range(8)
+        ]
+        self.message(self.alice, self.bob, 'nothing to see')
+
+        pages, seen, cursor = 0, [], None
+        while True:
+            params = {'q': 'report', 'limit': 3}
+            if cursor:
+                params['cursor'] = cursor
+            data = self.search(**params)
+            pages += 1
+            seen += data['results']
+            cursor = data['next']
+            if cursor is None:
+                break
+        self.assertEqual(pages, 3)
+        self.assertCountEqual([hit['id'] for hit in seen], [m.pk for m in messages])
+        # Best first, then newest, with no gaps or repeats across pages
+        keys = [(hit['score'], hit['id']) for hit in seen]
+        self.assertEqual(keys, sorted(keys, reverse=True))
+        self.assertLess(len({hit['score'] for hit in seen}), len(seen))
+        self.assertEqual(seen, self.search(q='report', limit=100)['results'])
+
+    def test_bad_cursor(self):
+        self.message(self.alice, self.bob, 'report')
+        data = self.search(q='report', limit=1)
+        self.assertIsNone(data['next'])
+        for cursor in ('garbage', '[1.0, 5]', '[1.0,5]:tampered'):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.search(status=400, q='report', cursor=cursor), {'cursor': 'Invalid cursor.'})
+
+    def test_snippet_is_escaped(self):
+        self.message(self.bob, self.alice, '<script>alert(1)</script> see <b>you</b> tomorrow & later')
+        [hit] = self.search(q='tomorrow')['results']
+        self.assertNotIn('<script>', hit['snippet'])
+        self.assertNotIn('<b>', hit['snippet'])
+        self.assertIn('&lt;script&gt;', hit['snippet'])
+        self.assertIn('&amp;', hit['snippet'])
+        self.assertIn('<mark>tomorrow</mark>', hit['snippet'])
+        # The content itself is returned as stored
+        self.assertTrue(hit['content'].startswith('<script>'))
+
+    def test_validation(self):
+        self.assertIn('q', self.search(status=400, q='  '))
+        self.assertIn('limit', self.search(status=400, q='x', limit='many'))
+        self.assertIn('limit', self.search(status=400, q='x', limit=0))
+        self.client.force_authenticate(None)
+        self.search(status=401, q='x')
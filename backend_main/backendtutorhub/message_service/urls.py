@@ -0,0 +1,7 @@
+from django.urls import path
+
+from .views import MessageSearchView
+
+urlpatterns = [
+    path('search/', MessageSearchView.as_view(), name='message-search'),
+]
@@ -1,3 +1,64 @@
-from django.shortcuts import render
+from django.core import signing
+from django.shortcuts import get_object_or_404
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-# Create your views here.
+from users_service.models import User
+from .search import search_messages
+
+_signer = signing.Signer(salt='message_service.search')
+
+
+class MessageSearchView(APIView):
+    """
+    GET /api/messages/search/?q=<words>[&with=<username>][&limit=<n>][&cursor=<next>]
+
+    Messages the caller sent or received that match `q`, best match first.
+    `with` restricts the search to the conversation with one user. Pass the
+    returned `next` as `cursor` for the following page; it's null on the
+    last one.
+    """
+    permission_classes = [IsAuthenticated]
+    default_limit = 20
+    max_limit = 100
+
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            raise ValidationError({'q': 'This query parameter is required.'})
+        try:
+            limit = min(int(request.query_params.get('limit', self.default_limit)), self.max_limit)
+        except ValueError:
+            raise ValidationError({'limit': 'A valid integer is required.'})
+        if limit < 1:
+            raise ValidationError({'limit': 'Ensure this value is greater than or equal to 1.'})
+
+        after = None
+        cursor = request.query_params.get('cursor')
+        if cursor:
+            try:
+                score, pk = _signer.unsign_object(cursor)
+            except (signing.BadSignature, TypeError, ValueError):
+                raise ValidationError({'cursor': 'Invalid cursor.'})
+            after = (score, pk)
+
+        other_user = None
+        if request.query_params.get('with'):
+            other_user = get_object_or_404(User, username=request.query_params['with'])
+
+        hits = search_messages(request.user, query, limit + 1, after=after, other_user=other_user)
+        next_cursor = None
+        if len(hits) > limit:
+            hits = hits[:limit]
+            message, score, _ = hits[-1]
+            next_cursor = _signer.sign_object([score, message.pk])
+
+        return Response({
+            'results': [
+                {'id': message.pk, **message.to_dict(), 'snippet': snippet, 'score': score}
+                for message, score, snippet in hits
+            ],
+            'next': next_cursor,
+        })
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class SyncServiceConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'sync_service'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,31 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from sync_service.models import ChangeLog
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete change log entries older than SYNC_LOG_RETENTION_DAYS. Cursors "
+        "older than that are already refused, so nothing can still need them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        # One extra day so entries just behind the oldest valid cursor stay
+        cutoff = timezone.now() - timedelta(days=settings.SYNC_LOG_RETENTION_DAYS + 1)
+        total = 0
+        while True:
+            seqs = list(
+                ChangeLog.objects.filter(created_at__lt=cutoff).order_by('seq')
+                .values_list('seq', flat=True)[:options['batch_size']]
+            )
+            if not seqs:
+                break
+            total += ChangeLog.objects.filter(seq__in=seqs).delete()[0]
+        self.stdout.write(f'Deleted {total} change log entries')
@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-19 16:39
+
+import sync_service.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sync_service', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='changelog',
+            name='sync_changelog_user_seq',
+        ),
+        migrations.AddField(
+            model_name='changelog',
+            name='xact_id',
+            field=models.BigIntegerField(db_default=sync_service.models.CurrentTransactionId(), editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='changelog',
+            index=models.Index(fields=['user', 'xact_id', 'seq'], name='sync_changelog_user_xact_seq'),
+        ),
+    ]
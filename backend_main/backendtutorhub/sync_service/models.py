@@ -0,0 +1,67 @@
+from django.db import models
+from django.utils import timezone
+
+from users_service.models import User
+
+
+class ChangeKind(models.TextChoices):
+    COURSE = 'course', 'Course'
+    REGISTRATION = 'registration', 'Course registration'
+    MESSAGE = 'message', 'Message'
+
+
+class ChangeOp(models.TextChoices):
+    UPSERT = 'upsert', 'Created or updated'
+    DELETE = 'delete', 'Deleted'
+
+
+class CurrentTransactionId(models.Func):
+    """The writing transaction's id on PostgreSQL, 0 on other databases."""
+    output_field = models.BigIntegerField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        return '0', []
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        # xid8 has no direct cast to bigint; it's 64 bit and never wraps
+        return 'pg_current_xact_id()::text::bigint', []
+
+
+class ChangeLog(models.Model):
+    """
+    One row per change to a synced object and per user who can see it.
+    Rows with no user (courses) are visible to everyone.
+
+    Clients page through the log in (xact_id, seq) order, on the
+    (user, xact_id, seq) index. `seq` alone isn't safe to page by: it's
+    handed out at insert time, so a long transaction can commit a low seq
+    after a higher one was already served. On PostgreSQL `xact_id` is the
+    id of the transaction that wrote the row and the sync view only serves
+    rows of transactions that have all finished (see SyncView), which any
+    transaction committing later has a higher id than.
+    """
+    seq = models.BigAutoField(primary_key=True)
+    # No FK constraint: rows are written from post_delete handlers while the
+    # user they point to may be deleted in the same cascade. Stale rows go
+    # away with prune_sync_log.
+    user = models.ForeignKey(
+        User,
+        null=True,
+        blank=True,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+    )
+    kind = models.CharField(max_length=16, choices=ChangeKind.choices)
+    object_id = models.CharField(max_length=36)
+    op = models.CharField(max_length=6, choices=ChangeOp.choices)
+    xact_id = models.BigIntegerField(db_default=CurrentTransactionId(), editable=False)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'xact_id', 'seq'], name='sync_changelog_user_xact_seq'),
+        ]
+
+    def __str__(self):
+        return f"#{self.seq} {self.op} {self.kind} {self.object_id}"
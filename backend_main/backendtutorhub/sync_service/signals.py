@@ -0,0 +1,46 @@
+"""
+Append to the change log whenever a synced object is saved or deleted.
+
+Bulk operations that skip signals (QuerySet.update(), bulk_create()) are
+not recorded; use them only for data the clients don't sync.
+"""
+from django.db import router
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from course_service.models import Course, CourseRegistration
+from course_service.signals import registration_teacher_id
+from message_service.models import Message
+from .models import ChangeKind, ChangeLog, ChangeOp
+
+
+def _registration_audience(registration):
+    return {registration.student_id, registration_teacher_id(registration)} - {None}
+
+
+AUDIENCES = {
+    # None: visible to every user, like /api/courses/public/
+    Course: (ChangeKind.COURSE, lambda course: [None]),
+    CourseRegistration: (ChangeKind.REGISTRATION, _registration_audience),
+    Message: (ChangeKind.MESSAGE, lambda message: {message.sender_id, message.receiver_id}),
+}
+
+
+def record(instance, op):
+    kind, audience = AUDIENCES[type(instance)]
+    ChangeLog.objects.using(router.db_for_write(ChangeLog)).bulk_create([
+        ChangeLog(user_id=user_id, kind=kind, object_id=str(instance.pk), op=op)
+        for user_id in audience(instance)
+    ])
+
+
+@receiver(post_save, dispatch_uid='sync_service.record_save')
+def record_save(sender, instance, raw=False, **kwargs):
+    if sender in AUDIENCES and not raw:
+        record(instance, ChangeOp.UPSERT)
+
+
+@receiver(post_delete, dispatch_uid='sync_service.record_delete')
+def record_delete(sender, instance, **kwargs):
+    if sender in AUDIENCES:
+        record(instance, ChangeOp.DELETE)
@@ -0,0 +1,147 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from course_service.models import Course, CourseRegistration
+from message_service.models import Message
+from users_service.models import User, UserRole
+from .models import ChangeLog
+from .views import _signer
+
+
+@override_settings(
+    SYNC_SETTLE_SECONDS=0,
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+)
+class SyncViewTests(TestCase):
+
+    def setUp(self):
+        self.teacher = User.objects.create(username='teacher', role=UserRole.TEACHER)
+        self.student = User.objects.create(username='student')
+        self.other = User.objects.create(username='other')
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def sync(self, cursor=None, **params):
+        if cursor is not None:
+            params['cursor'] = cursor
+        response = self.client.get('/api/sync/', params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def start(self):
+        return self.sync()['cursor']
+
+    def test_without_cursor_returns_head_and_no_changes(self):
+        Course.objects.create(title='Before', teacher=self.teacher)
+        data = self.sync()
+        self.assertEqual(data['changes'], {})
+        self.assertFalse(data['has_more'])
+        self.assertEqual(self.sync(data['cursor'])['changes'], {})
+
+    def test_upsert_then_delete_collapses_to_tombstone(self):
+        cursor = self.start()
+        course = Course.objects.create(title='Algebra', teacher=self.teacher)
+        registration = CourseRegistration.objects.create(student=self.student, course=course)
+        registration_id = registration.pk
+        registration.delete()
+
+        data = self.sync(cursor)
+        self.assertEqual([c['id'] for c in data['changes']['courses']['upserted']], [str(course.pk)])
+        self.assertEqual(data['changes']['registrations'], {'upserted': [], 'deleted': [str(registration_id)]})
+        self.assertFalse(data['has_more'])
+
+    def test_updates_collapse_to_one_upsert(self):
+        cursor = self.start()
+        course = Course.objects.create(title='Draft', teacher=self.teacher)
+        course.title = 'Final'
+        course.save()
+
+        courses = self.sync(cursor)['changes']['courses']
+        self.assertEqual([c['title'] for c in courses['upserted']], ['Final'])
+        self.assertEqual(courses['deleted'], [])
+
+    def test_paging_with_has_more(self):
+        cursor = self.start()
+        messages = [
+            Message.objects.create(sender=self.other, receiver=self.student, content=str(i))
+            for i in range(5)
+        ]
+
+        seen, pages = [], 0
+        while True:
+            data = self.sync(cursor, limit=2)
+            pages += 1
+            seen += [m['id'] for m in data['changes'].get('messages', {}).get('upserted', [])]
+            cursor = data['cursor']
+            if not data['has_more']:
+                break
+        self.assertEqual(pages, 3)
+        self.assertEqual(seen, [m.pk for m in messages])
+        self.assertEqual(self.sync(cursor)['changes'], {})
+
+    def test_object_deleted_before_its_page_is_served(self):
+        cursor = self.start()
+        message = Message.objects.create(sender=self.student, receiver=self.other, content='hi')
+        message_id = message.pk
+        Message.objects.create(sender=self.student, receiver=self.other, content='filler')
+        message.delete()
+
+        first = self.sync(cursor, limit=1)
+        # The row is gone, its tombstone comes later
+        self.assertEqual(first['changes']['messages'], {'upserted': [], 'deleted': []})
+        self.assertTrue(first['has_more'])
+        rest = self.sync(first['cursor'])
+        self.assertIn(message_id, rest['changes']['messages']['deleted'])
+
+    def test_only_own_changes(self):
+        cursor = self.start()
+        Message.objects.create(sender=self.teacher, receiver=self.other, content='not for student')
+        self.assertEqual(self.sync(cursor)['changes'], {})
+
+    def test_teacher_gets_registration_changes(self):
+        course = Course.objects.create(title='Algebra', teacher=self.teacher)
+        self.client.force_authenticate(self.teacher)
+        cursor = self.start()
+        registration = CourseRegistration.objects.create(student=self.student, course=course)
+
+        registrations = self.sync(cursor)['changes']['registrations']
+        self.assertEqual([r['id'] for r in registrations['upserted']], [str(registration.pk)])
+
+    def test_course_delete_writes_tombstones_for_its_registrations(self):
+        course = Course.objects.create(title='Algebra', teacher=self.teacher)
+        registration = CourseRegistration.objects.create(student=self.student, course=course)
+        course_id = course.pk
+        cursor = self.start()
+        course.delete()
+
+        changes = self.sync(cursor)['changes']
+        self.assertEqual(changes['courses']['deleted'], [str(course_id)])
+        self.assertEqual(changes['registrations']['deleted'], [str(registration.pk)])
+        self.assertEqual(ChangeLog.objects.filter(object_id=str(registration.pk), op='delete').count(), 2)
+
+    def test_teacher_is_looked_up_once(self):
+        course = Course.objects.create(title='Algebra', teacher=self.teacher)
+        registrations = [
+            CourseRegistration.objects.create(student=student, course=course)
+            for student in (self.student, self.other)
+        ]
+
+        def course_lookups(delete):
+            with CaptureQueriesContext(connection) as queries:
+                delete()
+            return [q for q in queries if q['sql'].startswith('SELECT') and 'FROM "course_service_course"' in q['sql']]
+
+        # Shared by the sync and the course_service receivers
+        self.assertEqual(len(course_lookups(CourseRegistration.objects.get(pk=registrations[0].pk).delete)), 1)
+        # Known from the course being deleted
+        self.assertEqual(course_lookups(course.delete), [])
+        self.assertEqual(ChangeLog.objects.filter(object_id=str(registrations[1].pk), op='delete').count(), 2)
+
+    def test_bad_and_legacy_cursors(self):
+        response = self.client.get('/api/sync/', {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 400)
+        # Plain seq cursors from before the log was ordered by transaction
+        response = self.client.get('/api/sync/', {'cursor': _signer.sign('5')})
+        self.assertEqual(response.status_code, 410)
@@ -0,0 +1,142 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from course_service.models import Course, CourseRegistration
+from course_service.serializers import CourseRegistrationSerializer, CourseSerializer
+from message_service.models import Message
+from .models import ChangeKind, ChangeLog, ChangeOp
+
+_signer = signing.TimestampSigner(salt='sync_service.cursor')
+
+
+class CursorExpired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = 'This cursor is too old, fetch everything again and restart from a new cursor.'
+    default_code = 'cursor_expired'
+
+
+def make_cursor(xact_id, seq):
+    return _signer.sign(f'{xact_id}.{seq}')
+
+
+def read_cursor(cursor):
+    """The (xact_id, seq) position a cursor points at."""
+    try:
+        value = _signer.unsign(cursor, max_age=timedelta(days=settings.SYNC_LOG_RETENTION_DAYS))
+    except signing.SignatureExpired:
+        raise CursorExpired()
+    except signing.BadSignature:
+        raise ValidationError({'cursor': 'Invalid cursor.'})
+    xact_id, dot, seq = value.partition('.')
+    if not dot:
+        # Cursor from before the log was ordered by transaction, there's no
+        # telling where it stands now
+        raise CursorExpired()
+    try:
+        return int(xact_id), int(seq)
+    except ValueError:
+        raise ValidationError({'cursor': 'Invalid cursor.'})
+
+
+def settled(log):
+    """
+    Only the entries whose transaction, and every transaction before it, has
+    finished. Anything that commits later sorts after them, so a cursor never
+    moves past an entry that isn't visible yet.
+    """
+    if connections[log.db].vendor == 'postgresql':
+        # Transactions below the snapshot's xmin are all committed or rolled
+        # back. A long-running write transaction anywhere in the database
+        # holds sync back until it ends.
+        return log.filter(xact_id__lt=RawSQL('pg_snapshot_xmin(pg_current_snapshot())::text::bigint', []))
+    # Elsewhere xact_id is 0 and entries are served in seq order once they're
+    # SYNC_SETTLE_SECONDS old. A transaction that takes longer than that
+    # between writing an entry and committing can have it skipped. (SQLite
+    # runs one write transaction at a time, so seq order is commit order.)
+    return log.filter(created_at__lte=timezone.now() - timedelta(seconds=settings.SYNC_SETTLE_SECONDS))
+
+
+def _serialize_messages(messages):
+    return [{'id': message.pk, **message.to_dict()} for message in messages]
+
+
+# kind -> (response key, queryset, serializer)
+SYNCED = {
+    ChangeKind.COURSE: ('courses', Course.objects.all(), lambda rows: CourseSerializer(rows, many=True).data),
+    ChangeKind.REGISTRATION: (
+        'registrations',
+        CourseRegistration.objects.all(),
+        lambda rows: CourseRegistrationSerializer(rows, many=True).data,
+    ),
+    ChangeKind.MESSAGE: ('messages', Message.objects.select_related('sender', 'receiver'), _serialize_messages),
+}
+
+
+class SyncView(APIView):
+    """
+    GET /api/sync/?cursor=<cursor>&limit=<n>
+
+    Without a cursor, returns the cursor for "now" and no changes: fetch the
+    full state from the regular endpoints after that, then keep calling with
+    the returned cursor. Each response holds the current version of every
+    object created or updated since the cursor, the ids of the deleted ones,
+    the next cursor and whether more changes are waiting (has_more).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        log = settled(ChangeLog.objects.filter(Q(user=request.user) | Q(user__isnull=True)))
+
+        cursor = request.query_params.get('cursor')
+        if not cursor:
+            head = log.order_by('-xact_id', '-seq').values_list('xact_id', 'seq').first() or (0, 0)
+            return Response({'cursor': make_cursor(*head), 'has_more': False, 'changes': {}})
+
+        after_xact_id, after_seq = read_cursor(cursor)
+        try:
+            limit = min(int(request.query_params.get('limit', settings.SYNC_PAGE_SIZE)), settings.SYNC_MAX_PAGE_SIZE)
+        except ValueError:
+            raise ValidationError({'limit': 'A valid integer is required.'})
+        if limit < 1:
+            raise ValidationError({'limit': 'Ensure this value is greater than or equal to 1.'})
+
+        entries = list(
+            log.filter(Q(xact_id__gt=after_xact_id) | Q(xact_id=after_xact_id, seq__gt=after_seq))
+            .order_by('xact_id', 'seq')
+            .values_list('xact_id', 'seq', 'kind', 'object_id', 'op')[:limit + 1]
+        )
+        has_more = len(entries) > limit
+        entries = entries[:limit]
+
+        # Only the last change to an object in this page matters
+        latest = {}
+        for xact_id, seq, kind, object_id, op in entries:
+            latest[kind, object_id] = op
+
+        changes = {}
+        for kind, (key, queryset, serialize) in SYNCED.items():
+            upserted = [object_id for (k, object_id), op in latest.items() if k == kind and op == ChangeOp.UPSERT]
+            deleted = [
+                queryset.model._meta.pk.to_python(object_id)
+                for (k, object_id), op in latest.items() if k == kind and op == ChangeOp.DELETE
+            ]
+            if not upserted and not deleted:
+                continue
+            # Objects deleted after the entry was written are missing here;
+            # their delete entry comes with a later page
+            rows = queryset.filter(pk__in=upserted) if upserted else []
+            changes[key] = {'upserted': serialize(rows), 'deleted': deleted}
+
+        position = entries[-1][:2] if entries else (after_xact_id, after_seq)
+        return Response({'cursor': make_cursor(*position), 'has_more': has_more, 'changes': changes})
@@ -0,0 +1,16 @@
+"""
+Async version of the public user list, see course_service/async_views.py.
+"""
+from rest_framework.permissions import AllowAny
+
+from backendtutorhub.async_api import AsyncListAPIView
+from .models import User
+from .serializers import PublicUserSerializer
+
+
+class AsyncPublicUserListView(AsyncListAPIView):
+    """Async PublicUserListView."""
+    queryset = User.objects.all()
+    serializer_class = PublicUserSerializer
+    permission_classes = [AllowAny]
+    filterset_fields = ['username', 'role', 'id']
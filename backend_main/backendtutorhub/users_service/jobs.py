@@ -0,0 +1,17 @@
+from django.core.mail import send_mail
+
+from jobs_service.queue import job
+from .models import User
+
+
+@job('users_service.send_welcome_email')
+def send_welcome_email(user_id):
+    user = User.objects.filter(pk=user_id).first()
+    if user is None or not user.email:
+        return
+    send_mail(
+        'Welcome to Tutorite',
+        f"Hi {user.username},\n\nyour {user.role} account is ready.",
+        None,
+        [user.email],
+    )
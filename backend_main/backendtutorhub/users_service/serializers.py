@@ -1,6 +1,8 @@
+from django.db import transaction
 from rest_framework import serializers
 from .models import User
 from rest_framework_simplejwt.tokens import RefreshToken
+from jobs_service.queue import enqueue
 
 
 class SignupSerializer(serializers.ModelSerializer):
@@ -20,9 +22,19 @@ class SignupSerializer(serializers.ModelSerializer):
         pw = validated_data.pop('password')
         user = User(**validated_data)
         user.set_password(pw)
-        user.save()
 
-        # Issue JWT tokens
+        # The email goes out from the job worker. The job is committed with
+        # the user row, so there's never one without the other.
+        with transaction.atomic():
+            user.save()
+            enqueue(
+                'users_service.send_welcome_email',
+                {'user_id': str(user.pk)},
+                idempotency_key=f'welcome-email:{user.pk}',
+            )
+
+        # Issue JWT tokens (the client needs them in this response, so this
+        # stays inline)
         tokens = RefreshToken.for_user(user)
         user.access = str(tokens.access_token)
         user.refresh = str(tokens)
@@ -1,6 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from .async_views import AsyncPublicUserListView
 from .views import PublicUserListView, SignupView, UserViewSet
 
 router = DefaultRouter()
@@ -12,6 +13,7 @@ urlpatterns = [
     path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('users/public/', PublicUserListView.as_view(), name='public-user-list'),
+    path('async/users/public/', AsyncPublicUserListView.as_view(), name='async-public-user-list'),
 
 
     # Then protected CRUD routes
@@ -9,6 +9,7 @@ from rest_framework.generics import ListAPIView
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
+from backendtutorhub.pagination import LimitOffsetPagination
 
 class SignupView(APIView):
     authentication_classes = []  
@@ -40,4 +41,5 @@ class PublicUserListView(ListAPIView):
     serializer_class = PublicUserSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['username','role','id']  # or any fields you want
-    permission_classes = []  # allow any
\ No newline at end of file
+    permission_classes = []  # allow any
+    pagination_class = LimitOffsetPagination